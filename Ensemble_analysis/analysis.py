@@ -1,25 +1,365 @@
 import mdtraj as md
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from ensemble_parser import CACHE_DIR, pdb_content_hash
 
-def calculate_residue_sasa(traj, residue_index, probe_radius=0.14):
+# Per-process state for SASA workers, set once by _init_sasa_worker
+_worker_state = {}
+
+def _init_sasa_worker(xyz_name, out_name, shape, topology, probe_radius):
+    """
+    Attaches a pool worker to the shared coordinate and output buffers.
+    The topology is sent once per worker instead of once per block.
+    """
+    xyz_shm = shared_memory.SharedMemory(name=xyz_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    n_frames, n_atoms = shape
+    _worker_state.update(
+        xyz_shm=xyz_shm,
+        out_shm=out_shm,
+        xyz=np.ndarray((n_frames, n_atoms, 3), dtype=np.float32, buffer=xyz_shm.buf),
+        out=np.ndarray((n_frames, n_atoms), dtype=np.float32, buffer=out_shm.buf),
+        topology=topology,
+        probe_radius=probe_radius,
+    )
+
+def _sasa_block_worker(block):
+    """
+    Shrake-Rupley on frames [start, stop), written straight into the shared output.
+    """
+    start, stop = block
+    state = _worker_state
+    traj = md.Trajectory(state['xyz'][start:stop], state['topology'])
+    state['out'][start:stop] = md.shrake_rupley(traj, probe_radius=state['probe_radius'], mode='atom')
+    return block
+
+def parallel_atom_sasa(traj, probe_radius=0.14, n_workers=None, block_size=None):
+    """
+    Per-atom SASA (n_frames, n_atoms) computed on a process pool over frame blocks.
+    Coordinates and results live in shared memory, so only (start, stop) pairs are pickled.
+    Frames are independent, so the stitched result matches md.shrake_rupley frame by frame.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    n_frames, n_atoms = traj.n_frames, traj.n_atoms
+    if n_workers <= 1 or n_frames <= 1:
+        return md.shrake_rupley(traj, probe_radius=probe_radius, mode='atom')
+
+    if block_size is None:
+        # A few blocks per worker keeps the pool balanced when frames differ in cost
+        block_size = max(1, -(-n_frames // (n_workers * 4)))
+    blocks = [(i, min(i + block_size, n_frames)) for i in range(0, n_frames, block_size)]
+
+    xyz_shm = shared_memory.SharedMemory(create=True, size=max(1, n_frames * n_atoms * 3 * 4))
+    out_shm = shared_memory.SharedMemory(create=True, size=max(1, n_frames * n_atoms * 4))
+    try:
+        xyz = np.ndarray((n_frames, n_atoms, 3), dtype=np.float32, buffer=xyz_shm.buf)
+        xyz[:] = traj.xyz
+        out = np.ndarray((n_frames, n_atoms), dtype=np.float32, buffer=out_shm.buf)
+
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, len(blocks)),
+            initializer=_init_sasa_worker,
+            initargs=(xyz_shm.name, out_shm.name, (n_frames, n_atoms), traj.topology, probe_radius),
+        ) as pool:
+            # Blocks write to disjoint slices; list() re-raises any worker error
+            list(pool.map(_sasa_block_worker, blocks))
+
+        result = out.copy()
+        del xyz, out
+    finally:
+        xyz_shm.close()
+        xyz_shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
+    return result
+
+def atom_sasa_cache_path(pdb_hash, probe_radius, cache_dir=CACHE_DIR, stride=1):
+    """
+    Location of the cached (n_frames, n_atoms) SASA matrix for a PDB hash and probe radius.
+    """
+    suffix = f"_s{stride}" if stride > 1 else ""
+    return os.path.join(cache_dir, f"sasa_{pdb_hash}_{probe_radius:.4f}{suffix}.npy")
+
+def load_atom_sasa(traj, pdb_path, probe_radius=0.14, cache_dir=CACHE_DIR, stride=1, n_workers=1):
+    """
+    Returns the full per-atom SASA matrix (n_frames, n_atoms) as a read-only float32 memmap.
+    Computed once per PDB content and probe radius, then served from disk.
+    `stride` must match the frame stride `traj` was loaded with.
+    With n_workers > 1 the first computation runs on a process pool (parallel_atom_sasa).
+    """
+    path = atom_sasa_cache_path(pdb_content_hash(pdb_path), probe_radius, cache_dir, stride)
+
+    if os.path.exists(path):
+        sasa = np.load(path, mmap_mode='r')
+        if sasa.shape == (traj.n_frames, traj.n_atoms):
+            return sasa
+        # Shape mismatch means a stale or truncated file; recompute below
+
+    sasa = parallel_atom_sasa(traj, probe_radius=probe_radius, n_workers=n_workers)
+
+    # Write to a temp file and rename so concurrent readers never see a partial file
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=sasa.shape)
+    out[:] = sasa
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+
+    return np.load(path, mmap_mode='r')
+
+def calculate_residue_sasa(traj, residue_index, probe_radius=0.14, atom_sasa=None, restricted=False,
+                           n_workers=1):
     """
     Calculates the SASA for a specific residue across all frames in the trajectory.
     Returns an array of SASA values (nm^2).
+    If `atom_sasa` (from load_atom_sasa) is given, this is just a column slice.
+    If `restricted` is True, only the residue's surface is computed (see restricted_residue_sasa).
+    With n_workers > 1 the full computation is split over frame blocks (parallel_atom_sasa).
     """
+    if restricted and atom_sasa is None:
+        return restricted_residue_sasa(traj, residue_index, probe_radius=probe_radius)
+
     # shrake_rupley returns (n_frames, n_atoms)
-    # We need to compute SASA for the whole complex (or just the chain?), 
+    # We need to compute SASA for the whole complex (or just the chain?),
     # extract atoms belonging to the residue, and sum/average them?
     # Usually residue SASA is the sum of atomic SASAs in that residue.
-    
-    sasa = md.shrake_rupley(traj, probe_radius=probe_radius, mode='atom')
-    
+
+    if atom_sasa is None:
+        sasa = parallel_atom_sasa(traj, probe_radius=probe_radius, n_workers=n_workers)
+    else:
+        sasa = atom_sasa
+
     # Get atom indices for the residue
     # We assume 'residue_index' is the global index in the topology
     residue = traj.topology.residue(residue_index)
     atom_indices = [atom.index for atom in residue.atoms]
-    
+
     # Sum SASA for these atoms
     # sasa shape: (n_frames, n_atoms)
-    residue_sasa = sasa[:, atom_indices].sum(axis=1)
-    
+    residue_sasa = np.asarray(sasa[:, atom_indices]).sum(axis=1)
+
     return residue_sasa
+
+def _sphere_points(n_points):
+    """
+    Golden section spiral points on the unit sphere, identical to MDTraj's Shrake-Rupley mesh.
+    """
+    i = np.arange(n_points, dtype=np.float64)
+    inc = np.pi * (3.0 - np.sqrt(5.0))
+    offset = 2.0 / n_points
+    y = i * offset - 1.0 + offset / 2.0
+    r = np.sqrt(1.0 - y * y)
+    phi = i * inc
+    return np.stack([np.cos(phi) * r, y, np.sin(phi) * r], axis=1).astype(np.float32)
+
+def _atom_radii(traj, probe_radius):
+    """
+    Per-atom Shrake-Rupley radii (van der Waals + probe, nm) using MDTraj's radius table.
+    """
+    from mdtraj.geometry.sasa import _ATOMIC_RADII
+    radii = np.array([_ATOMIC_RADII[atom.element.symbol] for atom in traj.topology.atoms], dtype=np.float32)
+    return radii + np.float32(probe_radius)
+
+def restricted_atom_sasa(traj, atom_indices, probe_radius=0.14, n_sphere_points=960):
+    """
+    Shrake-Rupley SASA for a subset of atoms only.
+    Test points are placed on the selected atoms, and occlusion is tested only against
+    atoms found within the interaction cutoff by a neighbour list, so the cost scales
+    with the selection size instead of the whole complex.
+    Returns an (n_frames, len(atom_indices)) array (nm^2), matching md.shrake_rupley.
+    """
+    atom_indices = np.asarray(atom_indices, dtype=np.intp)
+    radii = _atom_radii(traj, probe_radius)
+    sel_radii = radii[atom_indices]
+    sphere = _sphere_points(n_sphere_points)
+
+    # Any atom that can occlude a point on atom i lies within R_i + R_j of it
+    cutoff = sel_radii.max() + radii.max()
+    neighbors = md.compute_neighbors(traj, cutoff, atom_indices)
+
+    # Area represented by a single accessible point on each selected atom
+    point_area = 4.0 * np.pi * sel_radii ** 2 / n_sphere_points
+
+    out = np.zeros((traj.n_frames, len(atom_indices)), dtype=np.float32)
+    for frame, neigh in enumerate(neighbors):
+        # Single precision throughout, like MDTraj, so borderline points agree
+        xyz = traj.xyz[frame]
+        # (n_sel, 3, n_points) test points on the selected atoms
+        points = xyz[atom_indices][:, :, None] + sel_radii[:, None, None] * sphere.T[None, :, :]
+
+        # Blockers are the neighbours plus the other selected atoms
+        blockers = np.union1d(neigh, atom_indices)
+        blocker_xyz = xyz[blockers]
+        blocker_radii = radii[blockers]
+
+        # Per-atom neighbour list: blocker j can only occlude atom i if |r_i - r_j| < R_i + R_j
+        center_d2 = np.sum((xyz[atom_indices][:, None, :] - blocker_xyz[None, :, :]) ** 2, axis=-1)
+        close = center_d2 < (sel_radii[:, None] + blocker_radii[None, :]) ** 2
+        # An atom never occludes its own surface
+        close &= blockers[None, :] != atom_indices[:, None]
+        pair_atom, pair_blocker = np.nonzero(close)
+
+        # (n_pairs, n_points) test of every point on atom i against each of its neighbours
+        diff = points[pair_atom] - blocker_xyz[pair_blocker][:, :, None]
+        d2 = diff[:, 0] ** 2 + diff[:, 1] ** 2 + diff[:, 2] ** 2
+        pair_buried = d2 < (blocker_radii[pair_blocker] ** 2)[:, None]
+
+        # OR-reduce the pair rows back onto their atom (pairs are grouped by atom)
+        buried = np.zeros((len(atom_indices), n_sphere_points), dtype=bool)
+        if len(pair_atom):
+            starts = np.flatnonzero(np.r_[True, pair_atom[1:] != pair_atom[:-1]])
+            buried[pair_atom[starts]] = np.logical_or.reduceat(pair_buried, starts, axis=0)
+
+        accessible = n_sphere_points - buried.sum(axis=1)
+        out[frame] = accessible * point_area
+
+    return out
+
+def restricted_residue_sasa(traj, residue_index, probe_radius=0.14, n_sphere_points=960):
+    """
+    Residue SASA via restricted_atom_sasa: same values as calculate_residue_sasa,
+    without computing the surface of the rest of the complex.
+    """
+    residue = traj.topology.residue(residue_index)
+    atom_indices = [atom.index for atom in residue.atoms]
+    sasa = restricted_atom_sasa(traj, atom_indices, probe_radius=probe_radius,
+                                n_sphere_points=n_sphere_points)
+    return sasa.sum(axis=1)
+
+class RunningStats:
+    """
+    Streaming mean/variance (Chan et al. parallel Welford merge) and a fixed-bin
+    histogram over per-frame observables of shape (n_frames, n_features).
+    """
+    def __init__(self, n_features, bin_edges):
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.counts = np.zeros((n_features, len(self.bin_edges) - 1), dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+        n_b = len(values)
+        if n_b == 0:
+            return
+        mean_b = values.mean(axis=0)
+        m2_b = ((values - mean_b) ** 2).sum(axis=0)
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / n
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / n
+        self.n = n
+
+        # Values outside the range are clipped into the edge bins
+        n_bins = self.counts.shape[1]
+        idx = np.clip(np.searchsorted(self.bin_edges, values, side='right') - 1, 0, n_bins - 1)
+        for k in range(values.shape[1]):
+            self.counts[k] += np.bincount(idx[:, k], minlength=n_bins)
+
+    @property
+    def variance(self):
+        # Population variance, like ndarray.std() used on the page
+        return self.m2 / self.n if self.n else np.full_like(self.m2, np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+def residue_max_sasa(traj, residue_index, probe_radius=0.14):
+    """
+    Upper bound on a residue's SASA: the summed area of its isolated atom spheres (nm^2).
+    Used as a fixed histogram range before any frame has been seen.
+    """
+    radii = _atom_radii(traj, probe_radius)
+    atom_indices = [atom.index for atom in traj.topology.residue(residue_index).atoms]
+    return float(np.sum(4.0 * np.pi * radii[atom_indices] ** 2))
+
+def stream_residue_sasa(chunks, residue_index, probe_radius=0.14, n_bins=50, restricted=True):
+    """
+    Folds residue SASA into RunningStats chunk by chunk.
+    `chunks` is an iterator of trajectories (e.g. ensemble_parser.iter_trajectory_chunks).
+    Yields the updated RunningStats after every chunk so callers can show progress.
+    """
+    stats = None
+    for chunk in chunks:
+        if stats is None:
+            upper = residue_max_sasa(chunk, residue_index, probe_radius)
+            stats = RunningStats(1, np.linspace(0.0, upper, n_bins + 1))
+        values = calculate_residue_sasa(chunk, residue_index, probe_radius=probe_radius,
+                                        restricted=restricted)
+        stats.update(values)
+        yield stats
+
+def batch_glycan_sasa(traj, chain_graphs, atom_sasa=None, metadata=None, probe_radius=0.14, n_workers=1):
+    """
+    SASA of every glycan residue on every chain from a single per-atom SASA pass.
+    `chain_graphs` maps chain ID -> residue graph from ensemble_parser.build_pdb_graph.
+    Returns (per_frame, summary) DataFrames:
+      per_frame: one row per (frame, chain, residue), plus level='chain' rows with the chain total
+      summary:   mean/std/min/median/max over frames for each residue and chain
+    """
+    import pandas as pd
+
+    if atom_sasa is None:
+        atom_sasa = parallel_atom_sasa(traj, probe_radius=probe_radius, n_workers=n_workers)
+    metadata = metadata or {}
+
+    # Flatten all residues' atoms so one reduceat gives every residue column at once
+    rows = []
+    atom_indices = []
+    starts = []
+    for chain_id, graph in chain_graphs.items():
+        if graph is None:
+            continue
+        for node, data in sorted(graph.nodes(data=True)):
+            atoms = [atom.index for atom in traj.topology.residue(node).atoms]
+            if not atoms:
+                continue
+            starts.append(len(atom_indices))
+            atom_indices.extend(atoms)
+            rows.append((chain_id, node, data.get('name', ''), data.get('resSeq', -1)))
+
+    columns = ['frame', 'level', 'chain', 'glycan_id', 'residue_index', 'resName', 'resSeq', 'sasa']
+    if not rows:
+        empty = pd.DataFrame(columns=columns)
+        return empty, empty
+
+    selected = np.asarray(atom_sasa[:, atom_indices], dtype=np.float64)
+    residue_sasa = np.add.reduceat(selected, starts, axis=1)  # (n_frames, n_residues)
+
+    n_frames = residue_sasa.shape[0]
+    frames = np.arange(n_frames)
+    res_chain = np.array([r[0] for r in rows])
+
+    def tidy(values, level, chain, residue_index, res_name, res_seq):
+        # Long-format block for one column of per-frame values
+        return pd.DataFrame({
+            'frame': frames,
+            'level': level,
+            'chain': chain,
+            'glycan_id': metadata.get(chain, {}).get('glycan_id', ''),
+            'residue_index': residue_index,
+            'resName': res_name,
+            'resSeq': res_seq,
+            'sasa': values,
+        })
+
+    blocks = [tidy(residue_sasa[:, k], 'residue', *row) for k, row in enumerate(rows)]
+    for chain_id in dict.fromkeys(res_chain):
+        chain_total = residue_sasa[:, res_chain == chain_id].sum(axis=1)
+        blocks.append(tidy(chain_total, 'chain', chain_id, -1, '', -1))
+    per_frame = pd.concat(blocks, ignore_index=True)[columns]
+
+    summary = (
+        per_frame.groupby(['level', 'chain', 'glycan_id', 'residue_index', 'resName', 'resSeq'], sort=False)['sasa']
+        .agg(['mean', 'std', 'min', 'median', 'max'])
+        .reset_index()
+    )
+    # Population std, like the single-residue metrics on the page
+    summary['std'] = summary['std'] * np.sqrt((n_frames - 1) / n_frames) if n_frames > 1 else 0.0
+    return per_frame, summary
@@ -0,0 +1,114 @@
+import time
+import numpy as np
+import mdtraj as md
+import ensemble_parser
+import analysis
+
+def synthetic_chain(n_atoms, bond_length=1.5, seed=0):
+    """
+    Random-walk chain of atoms with roughly bonded spacing (Angstroms).
+    Gives a realistic neighbour density for the bond inference benchmark.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(size=(n_atoms, 3))
+    steps *= bond_length / np.linalg.norm(steps, axis=1)[:, None]
+    return np.cumsum(steps, axis=0)
+
+def infer_bonds_bruteforce(coords, threshold=ensemble_parser.BOND_THRESHOLD):
+    """
+    Reference O(N^2) implementation (the original loop) the KD-tree search is checked against.
+    """
+    threshold_sq = threshold ** 2
+    pairs = []
+    n_atoms = len(coords)
+    for i in range(n_atoms):
+        for j in range(i + 1, n_atoms):
+            d2 = np.sum((coords[i] - coords[j])**2)
+            if d2 < threshold_sq:
+                pairs.append((i, j))
+    return np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+def benchmark_bond_inference(sizes=(500, 1000, 2000, 10000, 50000), bruteforce_limit=2000):
+    """
+    Times KD-tree bond inference against the original double loop.
+    The brute force loop is skipped above `bruteforce_limit` atoms.
+    """
+    print(f"{'atoms':>8} {'kdtree (s)':>12} {'loop (s)':>12} {'pairs':>8}")
+    for n in sizes:
+        coords = synthetic_chain(n)
+
+        t0 = time.perf_counter()
+        pairs = ensemble_parser.infer_bonds_by_distance(coords)
+        t_tree = time.perf_counter() - t0
+
+        t_loop = float('nan')
+        if n <= bruteforce_limit:
+            t0 = time.perf_counter()
+            ref = infer_bonds_bruteforce(coords)
+            t_loop = time.perf_counter() - t0
+            assert np.array_equal(pairs, ref), "KD-tree pairs differ from brute force"
+
+        print(f"{n:>8} {t_tree:>12.4f} {t_loop:>12.4f} {len(pairs):>8}")
+
+def synthetic_trajectory(n_atoms, n_frames=10, atoms_per_residue=20, seed=0):
+    """
+    Multi-frame carbon-only trajectory along a random-walk chain, in nm.
+    """
+    top = md.Topology()
+    chain = top.add_chain()
+    carbon = md.element.carbon
+    residue = None
+    for i in range(n_atoms):
+        if i % atoms_per_residue == 0:
+            residue = top.add_residue('UNK', chain)
+        top.add_atom(f'C{i % atoms_per_residue}', carbon, residue)
+
+    rng = np.random.default_rng(seed)
+    base = synthetic_chain(n_atoms, seed=seed) / 10.0
+    xyz = base[None, :, :] + rng.normal(scale=0.01, size=(n_frames, n_atoms, 3))
+    return md.Trajectory(xyz.astype(np.float32), top)
+
+def benchmark_restricted_sasa(sizes=(1000, 5000, 20000), n_frames=10, residue_index=0):
+    """
+    Times single-residue SASA with the full Shrake-Rupley against the restricted mode.
+    """
+    print(f"{'atoms':>8} {'full (s)':>12} {'restricted (s)':>15} {'max diff':>10}")
+    for n in sizes:
+        traj = synthetic_trajectory(n, n_frames=n_frames)
+
+        t0 = time.perf_counter()
+        full = analysis.calculate_residue_sasa(traj, residue_index)
+        t_full = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        restricted = analysis.calculate_residue_sasa(traj, residue_index, restricted=True)
+        t_restricted = time.perf_counter() - t0
+
+        diff = np.abs(full - restricted).max()
+        print(f"{n:>8} {t_full:>12.4f} {t_restricted:>15.4f} {diff:>10.5f}")
+
+def benchmark_parallel_sasa(workers=(1, 2, 4, 8), n_atoms=2000, n_frames=64):
+    """
+    Scaling of parallel_atom_sasa with worker count on a synthetic ensemble.
+    """
+    traj = synthetic_trajectory(n_atoms, n_frames=n_frames)
+    print(f"{'workers':>8} {'time (s)':>12} {'speedup':>10}")
+    baseline = None
+    reference = None
+    for n in workers:
+        t0 = time.perf_counter()
+        sasa = analysis.parallel_atom_sasa(traj, n_workers=n)
+        elapsed = time.perf_counter() - t0
+
+        if baseline is None:
+            baseline, reference = elapsed, sasa
+        else:
+            # MDTraj itself can flip a near-tangent sphere point between single- and
+            # multi-frame calls, so allow a few points' worth of area
+            assert np.allclose(sasa, reference, atol=5e-3), "Parallel SASA differs from serial"
+        print(f"{n:>8} {elapsed:>12.4f} {baseline / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    benchmark_bond_inference()
+    benchmark_restricted_sasa()
+    benchmark_parallel_sasa()
@@ -1,6 +1,54 @@
 import mdtraj as md
 import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+import tempfile
+import hashlib
+import json
+import os
 import re
+import shutil
+import sys
+
+# The fixed-column PDB reader lives at the repository root, shared with the other apps.
+# Appended, so this directory's own modules still win over same-named root ones.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from pdb_reader import read_header
+
+# On-disk caches (binary ensembles, SASA matrices), shared across sessions and restarts
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Distance cutoff (Angstroms) for inferring bonds when CONECT records are missing.
+# Increased to catch stretched bonds.
+BOND_THRESHOLD = 2.0
+
+def infer_bonds_by_distance(coords, threshold=BOND_THRESHOLD):
+    """
+    Finds all atom pairs closer than `threshold` using a KD-tree.
+    `coords` is an (n_atoms, 3) array in Angstroms.
+    Returns an (n_pairs, 2) int array of (i, j) with i < j, sorted like the old double loop.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 2:
+        return np.empty((0, 2), dtype=np.intp)
+
+    tree = cKDTree(coords)
+    pairs = tree.query_pairs(threshold, output_type='ndarray')
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=np.intp)
+
+    # query_pairs is inclusive (<=), the original check was strict (<)
+    d2 = np.sum((coords[pairs[:, 0]] - coords[pairs[:, 1]]) ** 2, axis=1)
+    pairs = pairs[d2 < threshold ** 2]
+
+    # Deterministic (i, j) order so the residue graph is built the same way every time
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order]
+
+GLYCAN_REMARK_PATTERN = re.compile(rb"Chain\s+(\w+)\s+Glycan:\s+(\w+)")
 
 def parse_ensemble_remarks(pdb_file_path):
     """
@@ -8,34 +56,343 @@ def parse_ensemble_remarks(pdb_file_path):
     Returns a dictionary keyed by Chain ID containing Glycan ID and other metadata.
     """
     metadata = {}
-    
-    # We only need to read the remarks from the first model/frame generally, 
-    # but the format implies it might be repeated. 
-    # Let's read until we hit the first MODEL or ATOM record.
-    with open(pdb_file_path, 'r') as f:
-        for line in f:
-            if line.startswith("MODEL") or line.startswith("ATOM"):
-                break
-            if line.startswith("REMARK"):
-                # Example: REMARK    Chain B Glycan: G00026MO
-                match_glycan = re.search(r"Chain\s+(\w+)\s+Glycan:\s+(\w+)", line)
-                if match_glycan:
-                    chain_id, glycan_id = match_glycan.groups()
-                    if chain_id not in metadata:
-                        metadata[chain_id] = {}
-                    metadata[chain_id]['glycan_id'] = glycan_id
-                
-                # We can extract other fields if needed, like cluster_index, etc.
-                
+
+    # We only need the remarks before the first MODEL/ATOM record; only that header is
+    # read, and the regex runs on REMARK lines only
+    header = read_header(pdb_file_path, stop_records=(b'MODEL', b'ATOM'))
+    for i in header.find([b'REMARK']).tolist():
+        # Example: REMARK    Chain B Glycan: G00026MO
+        match_glycan = GLYCAN_REMARK_PATTERN.search(header.line(i))
+        if match_glycan:
+            chain_id, glycan_id = (g.decode() for g in match_glycan.groups())
+            if chain_id not in metadata:
+                metadata[chain_id] = {}
+            metadata[chain_id]['glycan_id'] = glycan_id
+
+        # We can extract other fields if needed, like cluster_index, etc.
+
     return metadata
 
-def load_trajectory(pdb_file_path):
+def load_trajectory(pdb_file_path, stride=1):
     """
     Loads the PDB file using MDTraj.
+    With stride > 1 only every stride-th model is read, via the MODEL offset index.
     """
+    if stride > 1:
+        index = load_model_index(pdb_file_path)
+        return read_frames(pdb_file_path, range(0, index['n_models'], stride), index=index)
     traj = md.load(pdb_file_path)
     return traj
 
+# Per-model REMARK fields, e.g. "REMARK    cluster_index 3" or "REMARK    Cluster: 3"
+MODEL_REMARK_PATTERN = re.compile(rb"REMARK\s+(\w+)\s*[:=]?\s*([-+\w.]+)\s*$")
+
+def model_index_path(pdb_file_path):
+    """
+    Sidecar file next to the PDB holding its MODEL/ENDMDL byte offsets.
+    """
+    return pdb_file_path + ".idx.npz"
+
+def build_model_index(pdb_file_path):
+    """
+    One pass over the file recording the byte range of every MODEL ... ENDMDL block
+    and any per-model REMARK fields (cluster index etc.).
+    Returns a dict with 'starts', 'ends' (int64 byte offsets), 'n_models', 'remarks'
+    (one dict per model) and 'sha256' (content hash, computed in the same pass).
+    """
+    starts, ends, remarks = [], [], []
+    offset = 0
+    current = None
+    h = hashlib.sha256()
+    with open(pdb_file_path, 'rb') as f:
+        for line in f:
+            h.update(line)
+            if line.startswith(b"MODEL"):
+                starts.append(offset)
+                current = {}
+            elif line.startswith(b"ENDMDL") and current is not None:
+                ends.append(offset + len(line))
+                remarks.append(current)
+                current = None
+            elif current is not None and line.startswith(b"REMARK"):
+                match = MODEL_REMARK_PATTERN.match(line.rstrip())
+                if match:
+                    key, value = match.groups()
+                    current[key.decode()] = value.decode()
+            offset += len(line)
+
+    if not starts:
+        # Single-model file without MODEL records: the whole file is frame 0
+        starts, ends, remarks = [0], [offset], [{}]
+
+    return {
+        'starts': np.array(starts[:len(ends)], dtype=np.int64),
+        'ends': np.array(ends, dtype=np.int64),
+        'n_models': len(ends),
+        'remarks': remarks,
+        'sha256': h.hexdigest(),
+    }
+
+def load_model_index(pdb_file_path):
+    """
+    Returns the model index from the sidecar file, rebuilding it when the PDB
+    has changed (size or mtime differ) or no sidecar exists yet.
+    """
+    stat = os.stat(pdb_file_path)
+    path = model_index_path(pdb_file_path)
+
+    if os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                if int(data['size']) == stat.st_size and int(data['mtime_ns']) == stat.st_mtime_ns:
+                    return {
+                        'starts': data['starts'],
+                        'ends': data['ends'],
+                        'n_models': len(data['ends']),
+                        'remarks': json.loads(str(data['remarks'])),
+                        'sha256': str(data['sha256']),
+                    }
+        except (OSError, KeyError, ValueError):
+            pass  # Corrupt sidecar, rebuild
+
+    index = build_model_index(pdb_file_path)
+    try:
+        np.savez(path, starts=index['starts'], ends=index['ends'],
+                 remarks=json.dumps(index['remarks']), sha256=index['sha256'],
+                 size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    except OSError:
+        pass  # Read-only location; the in-memory index still works
+    return index
+
+def pdb_content_hash(pdb_file_path):
+    """
+    SHA-256 of the PDB content, stored in the model index sidecar: it is only
+    recomputed when the file's size or mtime changes, so warm starts skip hashing.
+    """
+    return load_model_index(pdb_file_path)['sha256']
+
+def _model_coords(lines):
+    """
+    Fixed-column x, y, z (Angstroms) of the ATOM/HETATM records in `lines`.
+    """
+    return [
+        (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+        for line in lines
+        if line.startswith(("ATOM", "HETATM"))
+    ]
+
+def read_frames(pdb_file_path, frames, topology=None, index=None):
+    """
+    Reads only the requested models (e.g. one frame, range(0, n, stride), or any subset)
+    by seeking to their byte offsets. Returns an MDTraj trajectory in the given order.
+    """
+    if index is None:
+        index = load_model_index(pdb_file_path)
+    if topology is None:
+        topology = load_first_frame(pdb_file_path).topology
+
+    frames = list(frames)
+    xyz = np.empty((len(frames), topology.n_atoms, 3), dtype=np.float32)
+    with open(pdb_file_path, 'rb') as f:
+        for k, frame in enumerate(frames):
+            start, end = index['starts'][frame], index['ends'][frame]
+            f.seek(start)
+            lines = f.read(end - start).decode().splitlines()
+            coords = _model_coords(lines)
+            if len(coords) != topology.n_atoms:
+                raise ValueError(f"Model {frame} has {len(coords)} atoms, expected {topology.n_atoms}.")
+            xyz[k] = coords
+
+    # PDB is in Angstroms, MDTraj in nm
+    return md.Trajectory(xyz / 10.0, topology)
+
+# Topology columns stored in the binary cache (from Topology.to_dataframe)
+_TOPOLOGY_COLUMNS = ['serial', 'name', 'element', 'resSeq', 'resName', 'chainID', 'segmentID']
+
+def ensemble_cache_path(pdb_hash, cache_dir=CACHE_DIR):
+    """
+    Directory holding the binary cache for one PDB content hash.
+    """
+    return os.path.join(cache_dir, f"ensemble_{pdb_hash}")
+
+def write_ensemble_cache(pdb_file_path, cache_dir=CACHE_DIR, pdb_hash=None):
+    """
+    Converts an ensemble PDB into a binary cache directory:
+      xyz.npy        float32 (n_frames, n_atoms, 3) coordinates in nm, memory-mappable
+      topology.npz   atom table, bonds and chain IDs
+      metadata.json  source hash, glycan REMARK metadata and per-model REMARKs
+    Frames are streamed in chunks, so the PDB never has to fit in memory.
+    Returns the cache directory.
+    """
+    index = load_model_index(pdb_file_path)
+    if pdb_hash is None:
+        pdb_hash = index['sha256']
+    path = ensemble_cache_path(pdb_hash, cache_dir)
+
+    topology = load_first_frame(pdb_file_path, index=index).topology
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp_")
+    try:
+        xyz = np.lib.format.open_memmap(os.path.join(tmp_path, "xyz.npy"), mode='w+', dtype=np.float32,
+                                        shape=(index['n_models'], topology.n_atoms, 3))
+        n = 0
+        for chunk in iter_trajectory_chunks(pdb_file_path, topology=topology):
+            xyz[n:n + chunk.n_frames] = chunk.xyz
+            n += chunk.n_frames
+        xyz.flush()
+        del xyz
+
+        atoms, bonds = topology.to_dataframe()
+        np.savez(
+            os.path.join(tmp_path, "topology.npz"),
+            bonds=np.asarray(bonds, dtype=np.float64).reshape(-1, 4),
+            chain_ids=np.array([str(chain.chain_id) for chain in topology.chains]),
+            **{col: atoms[col].to_numpy() if pd.api.types.is_numeric_dtype(atoms[col])
+               else atoms[col].astype(str).to_numpy(dtype=str)
+               for col in _TOPOLOGY_COLUMNS}
+        )
+
+        with open(os.path.join(tmp_path, "metadata.json"), 'w') as f:
+            json.dump({
+                'source_hash': pdb_hash,
+                'glycans': parse_ensemble_remarks(pdb_file_path),
+                'model_remarks': index['remarks'],
+            }, f)
+
+        # Publish atomically; another session may have written the same cache meanwhile
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    finally:
+        # Left behind only if publishing failed or the PDB could not be converted
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+def load_ensemble_cache(pdb_file_path, cache_dir=CACHE_DIR, pdb_hash=None):
+    """
+    Opens the binary cache for this PDB's content.
+    Returns (traj, metadata) built from the memory-mapped coordinate array, or None
+    when no cache matches the current file content.
+    """
+    if pdb_hash is None:
+        pdb_hash = pdb_content_hash(pdb_file_path)
+    path = ensemble_cache_path(pdb_hash, cache_dir)
+
+    try:
+        with open(os.path.join(path, "metadata.json")) as f:
+            meta = json.load(f)
+        if meta.get('source_hash') != pdb_hash:
+            return None
+
+        with np.load(os.path.join(path, "topology.npz")) as data:
+            atoms = pd.DataFrame({col: data[col] for col in _TOPOLOGY_COLUMNS})
+            bonds = data['bonds']
+            chain_ids = data['chain_ids']
+        # Copy-on-write: MDTraj's C kernels need a writable buffer, the file stays untouched
+        xyz = np.load(os.path.join(path, "xyz.npy"), mmap_mode='c')
+    except (OSError, KeyError, ValueError):
+        return None
+
+    topology = md.Topology.from_dataframe(atoms, bonds if len(bonds) else None)
+    # from_dataframe drops the PDB chain letters
+    for chain, chain_id in zip(topology.chains, chain_ids):
+        chain.chain_id = str(chain_id)
+
+    return md.Trajectory(xyz, topology), meta['glycans']
+
+def load_ensemble(pdb_file_path, stride=1, cache_dir=CACHE_DIR):
+    """
+    Returns (traj, metadata), from the binary cache when it is current,
+    otherwise from the PDB (and writes the cache for next time).
+    """
+    pdb_hash = pdb_content_hash(pdb_file_path)
+    cached = load_ensemble_cache(pdb_file_path, cache_dir, pdb_hash)
+    if cached is None:
+        try:
+            write_ensemble_cache(pdb_file_path, cache_dir, pdb_hash)
+            cached = load_ensemble_cache(pdb_file_path, cache_dir, pdb_hash)
+        except (OSError, ValueError):
+            cached = None  # Cache location not writable, or models the chunked reader cannot convert
+
+    if cached is None:
+        traj = load_trajectory(pdb_file_path, stride=stride)
+        return traj, parse_ensemble_remarks(pdb_file_path)
+
+    traj, metadata = cached
+    if stride > 1:
+        traj = traj[::stride]
+    return traj, metadata
+
+def load_first_frame(pdb_file_path, index=None):
+    """
+    Loads only the first model of an ensemble PDB (topology + frame 0).
+    md.load would parse every model first, so we cut the text at the first ENDMDL and
+    append the records after the last model (CONECT), which carry the bonds.
+    """
+    header = []
+    with open(pdb_file_path, 'r') as f:
+        for line in f:
+            header.append(line)
+            if line.startswith("ENDMDL"):
+                break
+
+    if index is None:
+        index = load_model_index(pdb_file_path)
+    if len(index['ends']):
+        with open(pdb_file_path, 'rb') as f:
+            f.seek(int(index['ends'][-1]))
+            header.extend(line.decode() for line in f if line.startswith(b"CONECT"))
+
+    with tempfile.NamedTemporaryFile('w', suffix=".pdb", delete=False) as tmp:
+        tmp.writelines(header)
+        tmp_path = tmp.name
+    try:
+        return md.load(tmp_path)
+    finally:
+        os.remove(tmp_path)
+
+def iter_trajectory_chunks(pdb_file_path, chunk=100, topology=None):
+    """
+    Streams a multi-model PDB as MDTraj trajectories of at most `chunk` frames.
+    md.iterload loads whole PDB files before chunking, so coordinates are read
+    model by model here and only one chunk is held in memory at a time.
+    Atom order follows the file, which matches md.load for ensembles without altlocs.
+    """
+    if topology is None:
+        topology = load_first_frame(pdb_file_path).topology
+    n_atoms = topology.n_atoms
+
+    buffer = np.empty((chunk, n_atoms, 3), dtype=np.float32)
+    n_frames = 0
+    model = []
+
+    def flush_model():
+        nonlocal n_frames
+        if len(model) != n_atoms:
+            raise ValueError(f"Model has {len(model)} atoms, expected {n_atoms}.")
+        buffer[n_frames] = model
+        n_frames += 1
+        model.clear()
+
+    with open(pdb_file_path, 'r') as f:
+        for line in f:
+            if line.startswith("ATOM") or line.startswith("HETATM"):
+                model.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            elif line.startswith("ENDMDL") and model:
+                flush_model()
+                if n_frames == chunk:
+                    # PDB is in Angstroms, MDTraj in nm
+                    yield md.Trajectory(buffer / 10.0, topology)
+                    n_frames = 0
+
+    # Single-model files without MODEL/ENDMDL records
+    if model:
+        flush_model()
+    if n_frames:
+        yield md.Trajectory(buffer[:n_frames] / 10.0, topology)
+
 def build_pdb_graph(traj, chain_id):
     """
     Builds a NetworkX graph for a specific chain in the PDB topology.
@@ -168,23 +525,11 @@ def build_pdb_graph(traj, chain_id):
         atoms = list(chain_obj.atoms)
         atom_indices = [a.index for a in atoms]
         xyz = traj.xyz[0, atom_indices, :] * 10.0 # Convert nm to Angstroms
-        
-        # Simple N^2 check
-        import numpy as np
-        coords = xyz
-        n_atoms = len(atoms)
-        threshold = 2.0 # Increased to catch stretched bonds
-        threshold_sq = threshold ** 2
-        
-        for i in range(n_atoms):
-            for j in range(i + 1, n_atoms):
-                # Dist check
-                d2 = np.sum((coords[i] - coords[j])**2)
-                if d2 < threshold_sq:
-                    # Found a bond
-                    a1 = atoms[i]
-                    a2 = atoms[j]
-                    chain_bonds.append((a1, a2))
+
+        # KD-tree neighbour search instead of the N^2 double loop
+        pairs = infer_bonds_by_distance(xyz, threshold=BOND_THRESHOLD)
+        for i, j in pairs:
+            chain_bonds.append((atoms[i], atoms[j]))
 
     # Build Residue Graph from Atom Bonds
     for a1, a2 in chain_bonds:
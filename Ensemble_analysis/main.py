@@ -8,6 +8,7 @@ import seaborn as sns
 import pandas as pd
 import networkx as nx
 import tempfile
+import numpy as np
 
 st.set_page_config(page_title="Glycan Ensemble Analysis", layout="wide")
 
@@ -16,6 +17,17 @@ st.title("Glycan Ensemble SASA Analysis")
 # Sidebar: File Selection
 st.sidebar.header("Data Input")
 uploaded_file = st.sidebar.file_uploader("Upload Ensemble PDB", type=["pdb"])
+streaming_mode = st.sidebar.checkbox(
+    "Streaming mode (large ensembles)", value=False,
+    help="Reads frames in chunks and updates SASA statistics progressively instead of loading the whole ensemble."
+)
+frame_stride = st.sidebar.number_input(
+    "Frame stride", min_value=1, value=1, step=1,
+    help="Analyze every n-th model only. Frames are read by seeking to indexed MODEL offsets."
+)
+
+# Frames per chunk in streaming mode
+STREAM_CHUNK = 200
 
 # Local fallback
 LOCAL_PDB = "Ensemble_analysis/ensemble.pdb"
@@ -35,14 +47,32 @@ else:
 
 # Load Data
 @st.cache_resource
-def load_data(path):
-    traj = ensemble_parser.load_trajectory(path)
+def load_data(path, stride=1):
+    # Binary cache (memory-mapped coordinates + serialized topology); the PDB text is
+    # only parsed when no cache matches the file content
+    traj, metadata = ensemble_parser.load_ensemble(path, stride=stride)
+    return traj, metadata
+
+# Streaming mode only needs the topology and first frame up front
+@st.cache_resource
+def load_first_frame(path):
+    traj = ensemble_parser.load_first_frame(path)
     metadata = ensemble_parser.parse_ensemble_remarks(path)
     return traj, metadata
 
+# Per-atom SASA for the whole ensemble, computed once and memory-mapped from disk.
+# Residue selections are column slices of this matrix.
+@st.cache_resource
+def load_atom_sasa(path, probe_radius=0.14, stride=1, n_workers=1):
+    traj, _ = load_data(path, stride)
+    return analysis.load_atom_sasa(traj, path, probe_radius=probe_radius, stride=stride, n_workers=n_workers)
+
 try:
     with st.spinner("Loading Trajectory and Metadata..."):
-        traj, metadata = load_data(pdb_path)
+        if streaming_mode:
+            traj, metadata = load_first_frame(pdb_path)
+        else:
+            traj, metadata = load_data(pdb_path, frame_stride)
 except Exception as e:
     st.error(f"Error loading PDB: {e}")
     st.stop()
@@ -56,6 +86,14 @@ if not chains_with_glycans:
 # Selection UI
 st.sidebar.subheader("Configuration")
 selected_chain_id = st.sidebar.selectbox("Select Glycan Chain", chains_with_glycans)
+restricted_sasa = st.sidebar.checkbox(
+    "Restricted SASA (selected residue only)", value=False,
+    help="Computes only the selected residue's surface against its neighbours instead of the whole complex."
+)
+sasa_workers = st.sidebar.number_input(
+    "SASA worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+    help="Splits the full-complex SASA computation into frame blocks on a process pool."
+)
 
 glycan_info = metadata[selected_chain_id]
 glycan_id = glycan_info.get('glycan_id', 'Unknown')
@@ -132,14 +170,46 @@ with col_plot:
     )
 
     # 3. Calculate SASA
-    if selected_node_idx is not None:
+    residue_label = [opt[1] for opt in residue_options if opt[0] == selected_node_idx][0] if selected_node_idx is not None else None
+
+    if selected_node_idx is not None and streaming_mode:
+        # Fold chunks into running statistics and redraw after each one
+        progress_text = st.empty()
+        plot_slot = st.empty()
+        col_mean, col_std = st.columns(2)
+        mean_slot = col_mean.empty()
+        std_slot = col_std.empty()
+
+        chunks = ensemble_parser.iter_trajectory_chunks(pdb_path, chunk=STREAM_CHUNK, topology=traj.topology)
+        for stats in analysis.stream_residue_sasa(chunks, selected_node_idx, restricted=restricted_sasa):
+            progress_text.caption(f"Processed {stats.n} frames...")
+
+            fig, ax = plt.subplots(figsize=(6, 4))
+            widths = np.diff(stats.bin_edges)
+            ax.stairs(stats.counts[0] / (stats.n * widths), stats.bin_edges, fill=True, color='skyblue')
+            ax.set_title(f"SASA Density: {residue_label}")
+            ax.set_xlabel("SASA (nm²)")
+            ax.set_ylabel("Density")
+            plot_slot.pyplot(fig)
+            plt.close(fig)
+
+            mean_slot.metric("Mean SASA", f"{stats.mean[0]:.3f} nm²")
+            std_slot.metric("Std Dev", f"{stats.std[0]:.3f} nm²")
+
+        progress_text.caption("Done.")
+
+    elif selected_node_idx is not None:
         with st.spinner("Calculating SASA..."):
-            sasa_values = analysis.calculate_residue_sasa(traj, selected_node_idx)
+            if restricted_sasa:
+                sasa_values = analysis.calculate_residue_sasa(traj, selected_node_idx, restricted=True)
+            else:
+                atom_sasa = load_atom_sasa(pdb_path, stride=frame_stride, n_workers=sasa_workers)
+                sasa_values = analysis.calculate_residue_sasa(traj, selected_node_idx, atom_sasa=atom_sasa)
         
         # Plot
         fig, ax = plt.subplots(figsize=(6, 4))
         sns.kdeplot(sasa_values, ax=ax, fill=True, color='skyblue')
-        ax.set_title(f"SASA Density: {[opt[1] for opt in residue_options if opt[0] == selected_node_idx][0]}")
+        ax.set_title(f"SASA Density: {residue_label}")
         ax.set_xlabel("SASA (nm²)")
         ax.set_ylabel("Density")
         st.pyplot(fig)
@@ -147,6 +217,24 @@ with col_plot:
         st.metric("Mean SASA", f"{sasa_values.mean():.3f} nm²")
         st.metric("Std Dev", f"{sasa_values.std():.3f} nm²")
 
+# 4. Batch table: every glycan residue on every chain from one SASA pass
+st.subheader("All Glycan Residues (Batch)")
+if streaming_mode:
+    st.caption("Batch table needs the full ensemble; turn off streaming mode to use it.")
+elif st.button("Compute SASA for all glycan chains"):
+    with st.spinner("Calculating SASA for all glycan residues..."):
+        atom_sasa = load_atom_sasa(pdb_path, stride=frame_stride, n_workers=sasa_workers)
+        chain_graphs = {cid: ensemble_parser.build_pdb_graph(traj[0], cid) for cid in chains_with_glycans}
+        per_frame, summary = analysis.batch_glycan_sasa(traj, chain_graphs, atom_sasa=atom_sasa, metadata=metadata)
+
+    st.dataframe(summary, use_container_width=True)
+    st.download_button(
+        label="Download per-frame SASA table (CSV)",
+        data=per_frame.to_csv(index=False),
+        file_name="glycan_sasa_per_frame.csv",
+        mime="text/csv"
+    )
+
 # Clean up temp file if uploaded
 if uploaded_file is not None and pdb_path:
     # We can't delete it while used? OS dependent.
@@ -2,8 +2,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import pickle
-import seaborn as sns
 import matplotlib.pyplot as plt
+from sequence_scoring import (BW_ADJUST, DEFAULT_DATA, GRIDSIZE, POCKET_MEAN, SIGMA, SequenceIndex,
+                              closed_form_score, kde_fft)
+from query_cache import QueryCache, normalize_pattern
+from score_table import load_score_table
 
 # Load the optimized weights (cache this to avoid reloading)
 @st.cache_data
@@ -17,9 +20,11 @@ phi_weights_opt = optimized_weights[:11]  # First 11 weights for phi
 psi_weights_opt = optimized_weights[11:]  # Next 11 weights for psi
 
 # Load the PCA-transformed data and other datasets (no pocket data loading anymore)
+DATA_PATH = DEFAULT_DATA
+
 @st.cache_data
 def load_data():
-    pca_transformed_data = pd.read_csv('filtered_data_surrounding_sequence_pca1.csv')
+    pca_transformed_data = pd.read_csv(DATA_PATH)
     with open('new_pca_model_optimized.pkl', 'rb') as f:
         pca = pickle.load(f)
     return pca_transformed_data, pca
@@ -61,107 +66,93 @@ def format_sequence_for_legend(input_sequence):
     # Wrap the entire sequence in \mathtt{} for monospaced font
     return r"\mathtt{" + ''.join(formatted_sequence) + "}"
 
-# Function to compute partial matches for a sequence
-def partial_sequence_match(input_sequence, sequences):
-    matches = []
-    for seq in sequences:
-        is_match = True
-        for i, char in enumerate(input_sequence):
-            if char and seq[i] != char:  # If a character is provided and doesn't match
-                is_match = False
-                break
-        if is_match:
-            matches.append(seq)
-    return matches
-
-def process_sequence(input_sequence, seq_number):
-    if any(char for i, char in enumerate(input_sequence) if i != 5 and char):
-        # Convert input sequence to string
-        input_sequence_str = ''.join(input_sequence)
-        
-        # Find all sequences in the dataset that match the input
-        sequences = pca_transformed_data['Surrounding_sequence']
-        matching_sequences = partial_sequence_match(input_sequence, sequences)
-        
-        # Prepare KDE data lists
-        pca1_matching_seq = []
-        if matching_sequences:
-            # Extract PCA1 values for matching sequences
-            matching_seq_data = pca_transformed_data[pca_transformed_data['Surrounding_sequence'].isin(matching_sequences)]
-            pca1_matching_seq = matching_seq_data['PCA1'].tolist()
-        
-        return pca1_matching_seq
-    else:
-        return []
+# Positional inverted index over the dataset, built once per data load, together with
+# the per-query result cache (rows, KDE curve, score) shared by all sessions on that
+# dataset.
+QUERY_CACHE_BYTES = 256 * 1024 ** 2
 
-# Process both sequences and format for legend
-pca1_matching_seq1 = process_sequence(input_sequence1, 1)
-formatted_seq1 = format_sequence_for_legend(input_sequence1)
+@st.cache_resource
+def load_sequence_index(data):
+    index = SequenceIndex(data['Surrounding_sequence'], data['PCA1'])
+    return index, QueryCache(max_bytes=QUERY_CACHE_BYTES)
 
-pca1_matching_seq2 = process_sequence(input_sequence2, 2)
-formatted_seq2 = format_sequence_for_legend(input_sequence2)
+sequence_index, query_cache = load_sequence_index(pca_transformed_data)
 
 # Fix the pocket mean to 0.53 as requested
-pocket_mean = 2.30
+pocket_mean = POCKET_MEAN
 
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
+# Set the bandwidth parameter for Gaussian kernel
+sigma = SIGMA  # Adjust based on desired sensitivity
 
-# Gaussian kernel function
-def gaussian_kernel(u, sigma):
-    return (1 / (sigma * np.sqrt(2 * np.pi))) * np.exp(- (u ** 2) / (2 * sigma ** 2))
+# Precomputed single-position and frequent pair queries (built by score_table.py).
+# Only valid for the unmodified dataset and the scoring parameters it was built with.
+@st.cache_resource
+def load_precomputed_scores(path):
+    return load_score_table(path)
 
-# Scoring function using KDE and Gaussian kernel weighting
-def compute_score(f_x, x_values, x0, sigma):
-    """
-    Calculate a weighted score based on the proximity of KDE distribution to a reference point (x0).
-    
-    Parameters:
-    - f_x: KDE density values at points x_values
-    - x_values: x-axis values corresponding to f_x
-    - x0: Reference point (pocket mean)
-    - sigma: Bandwidth parameter for the Gaussian kernel
-    
-    Returns:
-    - score: Higher score indicates closer alignment with pocket mean
-    """
-    # Calculate Gaussian kernel weights centered on x0
-    K = gaussian_kernel(x_values - x0, sigma)
-    
-    # Compute the weighted score as the integral of the product f_x * K
-    weighted_score = np.trapz(f_x * K, x_values)
-    return weighted_score
+score_table = load_precomputed_scores(DATA_PATH)
+if score_table is not None and not score_table.matches(sequence_index.n_rows, pocket_mean, sigma):
+    score_table = None
 
-# Function to retrieve KDE values from Seaborn
-def get_kde_values(data, bw_adjust=0.5):
+# Function to compute KDE values directly (no figure is drawn)
+def get_kde_values(data, bw_adjust=BW_ADJUST, grid=None, gridsize=200):
     """
-    Calculate KDE values for a given data using Seaborn.
+    Calculate KDE values for a given data with the binned FFT engine.
+    Uses seaborn's bandwidth rule (Scott * bw_adjust); without `grid` it also uses
+    seaborn's evaluation grid, so the curve matches sns.kdeplot.
     
     Parameters:
     - data: Data points for which KDE needs to be computed
     - bw_adjust: Bandwidth adjustment for KDE
+    - grid: Optional x values to evaluate on
+    - gridsize: Number of points of seaborn's grid when `grid` is not given
     
     Returns:
-    - x_values, kde_values: x and y values for the KDE
+    - x_values, kde_values: x and y values for the KDE (empty if fewer than 2 distinct points)
     """
-    kde_plot = sns.kdeplot(data, bw_adjust=bw_adjust)
-    x_values, kde_values = kde_plot.get_lines()[0].get_data()
-    plt.close()  # Close the plot as we only need the data
-    return x_values, kde_values
+    return kde_fft(data, bw_adjust=bw_adjust, grid=grid, gridsize=gridsize)
 
-# Calculate KDE for each sequence and pocket data
-x_values_seq1, kde_values_seq1 = get_kde_values(pca1_matching_seq1)
-x_values_seq2, kde_values_seq2 = get_kde_values(pca1_matching_seq2)
+def query_results(input_sequence):
+    """
+    Matching row ids, KDE curve (on the query's own seaborn grid) and score for one
+    partial sequence. Precomputed patterns come from the score table (without row ids),
+    others from the shared LRU cache when the pattern was seen before.
+    """
+    pattern = normalize_pattern(input_sequence)
 
+    precomputed = score_table.lookup(pattern) if score_table is not None else None
+    if precomputed is not None:
+        n_match, x_values, kde_values, score = precomputed
+        return {'rows': None, 'n_match': n_match, 'x': x_values, 'kde': kde_values, 'score': score}
 
+    def compute():
+        if any(char for i, char in enumerate(pattern) if i != 5):
+            rows = np.array(sequence_index.match_rows(pattern))
+        else:
+            rows = np.empty(0, dtype=np.intp)
+        pca1 = sequence_index.pca1[rows]
+        x_values, kde_values = get_kde_values(pca1, gridsize=GRIDSIZE)
+        return {
+            'rows': rows,
+            'n_match': len(rows),
+            'x': x_values,
+            'kde': kde_values,
+            # Exact KDE * Gaussian integral, no grid involved
+            'score': closed_form_score(pca1, pocket_mean, sigma, bw_adjust=BW_ADJUST),
+        }
+
+    return query_cache.get_or_compute((pattern, pocket_mean, sigma), compute)
+
+# Process both sequences and format for legend; an unchanged input is a cache hit
+results_seq1 = query_results(input_sequence1)
+formatted_seq1 = format_sequence_for_legend(input_sequence1)
 
-# Set the bandwidth parameter for Gaussian kernel
-sigma = 0.1  # Adjust based on desired sensitivity
+results_seq2 = query_results(input_sequence2)
+formatted_seq2 = format_sequence_for_legend(input_sequence2)
+
+x_values_seq1, kde_values_seq1, score_seq1 = results_seq1['x'], results_seq1['kde'], results_seq1['score']
+x_values_seq2, kde_values_seq2, score_seq2 = results_seq2['x'], results_seq2['kde'], results_seq2['score']
 
-# Compute scores for each sequence
-score_seq1 = compute_score(kde_values_seq1, x_values_seq1, pocket_mean, sigma)
-score_seq2 = compute_score(kde_values_seq2, x_values_seq2, pocket_mean, sigma)
 # Display scores in the Streamlit app
 st.write(f"Score for Sequence 1: {score_seq1}")
 st.write(f"Score for Sequence 2: {score_seq2}")
@@ -169,11 +160,11 @@ st.write(f"Score for Sequence 2: {score_seq2}")
 # Create plot with KDE for matching sequences and a line for fixed pocket data
 fig, ax = plt.subplots(figsize=(10, 6))
 
-# Plot KDE for matching sequences
-if pca1_matching_seq1:
-    sns.kdeplot(pca1_matching_seq1, ax=ax, label=f"Sequences 1: {r'${}$'.format(formatted_seq1)}", bw_adjust=0.5, color="blue")
-if pca1_matching_seq2:
-    sns.kdeplot(pca1_matching_seq2, ax=ax, label=f"Sequences 2: {r'${}$'.format(formatted_seq2)}", bw_adjust=0.5, color="red")
+# Plot KDE for matching sequences (same curves the scores were computed from)
+if len(x_values_seq1):
+    ax.plot(x_values_seq1, kde_values_seq1, label=f"Sequences 1: {r'${}$'.format(formatted_seq1)}", color="blue")
+if len(x_values_seq2):
+    ax.plot(x_values_seq2, kde_values_seq2, label=f"Sequences 2: {r'${}$'.format(formatted_seq2)}", color="red")
 
 # Plot a vertical line at the fixed mean of 0.53 for pocket data
 ax.axvline(pocket_mean, color='orange', linestyle='--', label=f"OST Pocket (Fixed at 0.53)")
@@ -187,3 +178,11 @@ ax.legend()
 
 # Render the plot in Streamlit
 st.pyplot(fig)
+
+# Query cache instrumentation (shared across sessions)
+cache_stats = query_cache.stats()
+st.sidebar.caption(
+    f"Query cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1024 ** 2:.1f} / "
+    f"{cache_stats['max_bytes'] / 1024 ** 2:.0f} MB, {cache_stats['hits']} hits, "
+    f"{cache_stats['misses']} misses, {cache_stats['evictions']} evictions"
+)
@@ -1,90 +1,168 @@
 import streamlit as st
-from Bio.PDB import PDBParser, PDBIO, Select
-from io import StringIO
 import numpy as np
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pdb_reader import ATOM_RECORDS, BFACTOR, CHAIN, ICODE, NAME, PDBText
 
-# Custom Select class to include all atoms
-class AllAtoms(Select):
-    def accept_atom(self, atom):
-        return True
-
-def parse_pdb(file):
-    parser = PDBParser(QUIET=True)
-    content = file.read().decode("utf-8")  # Decode the bytes to a string
-    structure = parser.get_structure('structure', StringIO(content))
-    return structure
-
-def get_atom_key(atom):
+def read_bfactor_table(content):
     """
-    Create a unique key for each atom based on chain, residue, and atom name.
+    Columnar atom table of a PDB file (bytes), read with the shared fixed-column reader:
+      text     PDBText of the file, kept to rewrite the template
+      line     line index of every ATOM/HETATM record
+      key      S10 atom key: atom name + chain + resSeq + iCode (fixed columns)
+      bfactor  float64 B-factors (NaN where the column is blank)
     """
-    return (
-        atom.get_parent().get_parent().id,  # Chain ID
-        atom.get_parent().id[1],            # Residue number
-        atom.get_name()                     # Atom name
-    )
+    text = PDBText(content)
+    lines = text.find(ATOM_RECORDS)
+    keys = np.char.add(text.field(*NAME, lines), text.field(CHAIN[0], ICODE[1], lines))
+    return {'text': text, 'line': lines, 'key': keys, 'bfactor': text.numbers(*BFACTOR, lines)}
 
-def average_bvalues(structures):
+def align_bfactors(keys, table):
     """
-    Average B-values across multiple structures.
-    Assumes all structures have the same atoms in the same order.
+    Sort-merge join of one table onto sorted unique template `keys`.
+    Returns per-key (sum, count) of the table's B-factors and the number of its atoms
+    without a template counterpart. Atoms sharing a key (other models, alternate
+    locations) are pooled.
     """
-    atom_bvals = {}
-    atom_order = []
-
-    for idx, structure in enumerate(structures):
-        for model in structure:
-            for chain in model:
-                for residue in chain:
-                    for atom in residue:
-                        key = get_atom_key(atom)
-                        if idx == 0:
-                            atom_order.append(key)
-                            atom_bvals[key] = [atom.get_bfactor()]
-                        else:
-                            if key in atom_bvals:
-                                atom_bvals[key].append(atom.get_bfactor())
-                            else:
-                                st.warning(f"Atom {key} not found in all structures.")
-                                # Handle missing atoms by skipping or filling with NaN
-                                atom_bvals[key] = atom_bvals.get(key, []) + [np.nan]
-
-    # Compute average, ignoring NaN
-    averaged_bvals = {}
-    for key in atom_order:
-        bvals = atom_bvals.get(key, [])
-        if bvals:
-            averaged_bvals[key] = np.nanmean(bvals)
-        else:
-            averaged_bvals[key] = 0.0  # Default value if no B-values
-
-    return averaged_bvals, atom_order
+    table_keys, inverse = np.unique(table['key'], return_inverse=True)
+    valid = ~np.isnan(table['bfactor'])
+    sums = np.bincount(inverse, weights=np.where(valid, table['bfactor'], 0.0), minlength=len(table_keys))
+    counts = np.bincount(inverse, weights=valid, minlength=len(table_keys))
+
+    pos = np.searchsorted(keys, table_keys)
+    pos[pos == len(keys)] = 0
+    hit = keys[pos] == table_keys if len(keys) else np.zeros(len(table_keys), dtype=bool)
+
+    key_sums = np.zeros(len(keys))
+    key_counts = np.zeros(len(keys))
+    key_sums[pos[hit]] = sums[hit]
+    key_counts[pos[hit]] = counts[hit]
+    unmatched = int(np.count_nonzero(np.isin(inverse, np.flatnonzero(~hit))))
+    return key_sums, key_counts, unmatched
+
+def write_bfactors(template, bfactors):
+    """
+    PDB text of the template with only the B-factor columns of its atom records replaced.
+    Full-width records are patched in place in a copy of the file buffer; records too
+    short to hold the column are padded. Raises ValueError if a value does not fit the
+    6-column field (-99.99 to 999.99) rather than writing a truncated number.
+    """
+    text, lines = template['text'], template['line']
+    formatted = np.char.mod('%6.2f', np.nan_to_num(bfactors))
+    too_wide = np.flatnonzero(np.char.str_len(formatted) > 6)
+    if len(too_wide):
+        i = too_wide[0]
+        raise ValueError(f"B-factor {formatted[i].strip()} on line {lines[i] + 1} does not fit the PDB "
+                         f"B-factor column (-99.99 to 999.99); {len(too_wide)} value(s) out of range")
+    formatted = formatted.astype('S6')
+
+    buffer = text.buffer.copy()
+    full = text.ends[lines] - text.starts[lines] >= BFACTOR[1]
+    columns = text.starts[lines[full]][:, None] + np.arange(*BFACTOR)
+    buffer[columns] = formatted[full].view(np.uint8).reshape(-1, 6)
+    content = buffer.tobytes()
+
+    if not full.all():
+        short = dict(zip(lines[~full].tolist(), formatted[~full].tolist()))
+        out = []
+        for i in range(text.n_lines):
+            line = content[text.starts[i]:text.ends[i]]
+            if i in short:
+                line = line.ljust(BFACTOR[0]) + short[i]
+            out.append(line)
+        content = b'\n'.join(out) + b'\n'
+    return content.decode('utf-8', errors='replace')
+
+def parse_bfactor_arrays(content):
+    """
+    Pool worker: atom keys and B-factors of one PDB (bytes), without the line text,
+    so only ~18 bytes per atom are pickled back to the parent.
+    """
+    table = read_bfactor_table(content)
+    return {'key': table['key'], 'bfactor': table['bfactor']}
 
-def create_averaged_structure(structure, averaged_bvals):
+def iter_bfactor_arrays(contents, n_workers=1):
     """
-    Create a new structure with averaged B-values.
+    Yields parse_bfactor_arrays(content) for each item of `contents`, in order.
+    With n_workers > 1 files are parsed on a process pool with at most two files
+    per worker in flight, so uploads are not all copied to the workers at once.
     """
-    from copy import deepcopy
-    new_structure = deepcopy(structure)
-
-    for model in new_structure:
-        for chain in model:
-            for residue in chain:
-                for atom in residue:
-                    key = get_atom_key(atom)
-                    if key in averaged_bvals:
-                        atom.set_bfactor(averaged_bvals[key])
-    return new_structure
-
-def structure_to_pdb(structure):
+    if n_workers <= 1:
+        for content in contents:
+            yield parse_bfactor_arrays(content)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pending = deque()
+        for content in contents:
+            pending.append(pool.submit(parse_bfactor_arrays, content))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class BFactorStats:
     """
-    Convert a Biopython structure to PDB format string.
+    Streaming per-atom B-factor statistics over any number of files, aligned on the
+    template's atom keys. Each file is folded in with `update` and can be dropped
+    afterwards, so memory is O(n_atoms).
+    `average` is the plain sum / count over every record (the values written to the
+    averaged PDB, rounded exactly like a two-pass mean). Welford running mean/variance
+    and min/max treat each file as one value per key (the mean of its records sharing
+    that key).
     """
-    io = PDBIO()
-    io.set_structure(structure)
-    string_io = StringIO()
-    io.save(string_io, select=AllAtoms())
-    return string_io.getvalue()
+    def __init__(self, template):
+        self.template = template
+        self.keys, self.inverse = np.unique(template['key'], return_inverse=True)
+        n_keys = len(self.keys)
+        self.n_files = 0
+        self.total = np.zeros(n_keys)
+        self.count = np.zeros(n_keys)
+        self.n = np.zeros(n_keys, dtype=np.int64)
+        self.mean = np.zeros(n_keys)
+        self.m2 = np.zeros(n_keys)
+        self.min = np.full(n_keys, np.inf)
+        self.max = np.full(n_keys, -np.inf)
+
+    def update(self, table):
+        """
+        Folds one atom table in; returns its number of atoms missing from the template.
+        """
+        sums, counts, unmatched = align_bfactors(self.keys, table)
+        self.total += sums
+        self.count += counts
+        present = counts > 0
+        values = sums[present] / counts[present]
+
+        self.n[present] += 1
+        delta = values - self.mean[present]
+        self.mean[present] += delta / self.n[present]
+        self.m2[present] += delta * (values - self.mean[present])
+        self.min[present] = np.minimum(self.min[present], values)
+        self.max[present] = np.maximum(self.max[present], values)
+        self.n_files += 1
+        return unmatched
+
+    @property
+    def average(self):
+        # 0.0 for atoms seen in no file
+        return np.divide(self.total, self.count, out=np.zeros_like(self.total), where=self.count > 0)
+
+    @property
+    def variance(self):
+        # Population variance; NaN for atoms seen in no file
+        return np.divide(self.m2, self.n, out=np.full_like(self.m2, np.nan), where=self.n > 0)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def per_atom(self, values):
+        """
+        Expands per-key values to the template's atom records.
+        """
+        return values[self.inverse]
 
 def main():
     st.title("Average B-values from Multiple PDB Files")
@@ -95,6 +173,14 @@ def main():
     """)
 
     uploaded_files = st.file_uploader("Choose PDB files", type=["pdb"], accept_multiple_files=True)
+    n_workers = st.number_input(
+        "Parser worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+        help="Parses the uploaded files on a process pool; useful for many or large files."
+    )
+    output_std = st.checkbox(
+        "Also output standard deviation PDB",
+        help="Writes a second PDB with the per-atom standard deviation of the B-values in the B-factor column."
+    )
 
     if uploaded_files:
         if len(uploaded_files) < 2:
@@ -102,15 +188,30 @@ def main():
         else:
             with st.spinner("Processing PDB files..."):
                 try:
-                    structures = [parse_pdb(file) for file in uploaded_files]
-                    averaged_bvals, atom_order = average_bvalues(structures)
-
-                    # Use the first structure as a template
-                    template_structure = structures[0]
-                    averaged_structure = create_averaged_structure(template_structure, averaged_bvals)
-                    pdb_string = structure_to_pdb(averaged_structure)
-
-                    st.success("Averaged B-values computed successfully!")
+                    # One file at a time into running statistics; the first file is the
+                    # template and is parsed here, the others on the worker pool
+                    progress = st.progress(0.0, text="Parsing PDB files...")
+                    template = read_bfactor_table(uploaded_files[0].getvalue())
+                    stats = BFactorStats(template)
+                    stats.update(template)
+                    others = uploaded_files[1:]
+                    contents = (file.getvalue() for file in others)
+                    for i, (file, table) in enumerate(zip(others, iter_bfactor_arrays(contents, n_workers)), start=2):
+                        n_missing = stats.update(table)
+                        if n_missing:
+                            st.warning(f"{n_missing} atoms of {file.name} not found in {uploaded_files[0].name}.")
+                        progress.progress(i / len(uploaded_files), text=f"Parsed {i} of {len(uploaded_files)} files")
+                    progress.empty()
+
+                    # Only the template's B-factor columns are rewritten
+                    pdb_string = write_bfactors(stats.template, stats.per_atom(stats.average))
+
+                    st.success(f"Averaged B-values of {stats.n_files} files computed successfully!")
+                    st.write(
+                        f"B-value range across files: {np.nanmin(np.where(stats.n > 0, stats.min, np.nan)):.2f}"
+                        f" to {np.nanmax(np.where(stats.n > 0, stats.max, np.nan)):.2f}; "
+                        f"mean per-atom standard deviation {np.nanmean(stats.std):.2f}"
+                    )
 
                     # Provide download link
                     st.download_button(
@@ -119,6 +220,13 @@ def main():
                         file_name="averaged_bvalues.pdb",
                         mime="chemical/x-pdb"
                     )
+                    if output_std:
+                        st.download_button(
+                            label="Download Standard Deviation PDB",
+                            data=write_bfactors(stats.template, stats.per_atom(np.nan_to_num(stats.std))),
+                            file_name="std_bvalues.pdb",
+                            mime="chemical/x-pdb"
+                        )
 
                 except Exception as e:
                     st.error(f"An error occurred: {e}")
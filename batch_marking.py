@@ -0,0 +1,317 @@
+"""
+Batch marking for the rubric scripts (main.py, thermo.py, cool_drinking.py,
+double_salt.py, diaquaoxalatoiron.py).
+
+A rubric is a JSON file in rubrics/ with the script's sections, maximum marks and
+default feedback. A cohort is a CSV or spreadsheet with one row per student:
+an ID column, one marks column per section (named exactly like the section) and
+an optional "<section> feedback" column (blank cells fall back to the rubric's
+default feedback). The whole cohort is validated in one vectorized pass. Feedback
+tables are rendered on a process pool and streamed into a zip with a summary CSV.
+"""
+import io
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+RUBRIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rubrics")
+FEEDBACK_SUFFIX = " feedback"
+
+def load_rubric(source):
+    """
+    Rubric dict from a path or file-like JSON. Required: "sections" {name: max mark}.
+    Optional: "title", "default_feedback" {name: text}, "mark_format" (format spec for
+    marks, ".1f" like most scripts or "g" for thermo.py's integer slider marks),
+    "step" (marks must be multiples of it) and "max_tolerance" (allowed excess over
+    a section's maximum; main.py's inputs allow +0.1).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as f:
+            rubric = json.load(f)
+    else:
+        rubric = json.load(source)
+    if not isinstance(rubric.get('sections'), dict) or not rubric['sections']:
+        raise ValueError("Rubric needs a non-empty 'sections' mapping of section name to maximum mark")
+    rubric.setdefault('title', 'Feedback')
+    rubric.setdefault('default_feedback', {})
+    rubric.setdefault('mark_format', '.1f')
+    rubric.setdefault('step', None)
+    rubric.setdefault('max_tolerance', 0.0)
+    return rubric
+
+def bundled_rubrics():
+    """
+    {file name: path} of the rubrics shipped in rubrics/.
+    """
+    if not os.path.isdir(RUBRIC_DIR):
+        return {}
+    return {name: os.path.join(RUBRIC_DIR, name) for name in sorted(os.listdir(RUBRIC_DIR)) if name.endswith('.json')}
+
+def create_feedback_table(marks_awarded, feedback_given, sections, mark_format='.1f'):
+    """
+    Feedback table of the rubric scripts and of batch marking. `mark_format` is the
+    rubric's format spec for marks ('.1f' for main.py and the experiment scripts,
+    'g' for thermo.py's integer slider marks).
+    """
+    section_width = max(len(s) for s in sections) + 2  # Longest section name + padding
+    marks_width = 10  # "x.x/xx" format
+    feedback_width = 60  # Fixed width for feedback
+
+    header = (
+        f"| {'Section'.ljust(section_width)} | "
+        f"{'Marks'.center(marks_width)} | "
+        f"{'Feedback'.ljust(feedback_width)} |\n"
+        f"|{'-' * section_width}|{'-' * marks_width}|{'-' * feedback_width}|\n"
+    )
+
+    rows = ""
+    for section, max_mark in sections.items():
+        marks_str = f"{marks_awarded[section]:{mark_format}}/{max_mark:{mark_format}}"
+        rows += (
+            f"| {section.ljust(section_width)} | "
+            f"{marks_str.center(marks_width)} | "
+            f"{feedback_given[section].ljust(feedback_width)} |\n"
+        )
+
+    total_marks = sum(marks_awarded.values())
+    total_max = sum(sections.values())
+    total_marks_str = f"{total_marks:{mark_format}}/{total_max:{mark_format}}"
+
+    footer = (
+        f"| {'Total'.ljust(section_width)} | "
+        f"{total_marks_str.center(marks_width)} | "
+        f"{' ' * feedback_width} |\n"
+        f"|{'=' * (section_width + marks_width + feedback_width + 5)}|\n"
+    )
+
+    return header + rows + footer
+
+def read_cohort(source, filename=None):
+    """
+    Cohort table from a CSV or spreadsheet (path or uploaded file); all cells as read by pandas.
+    .xlsx/.xlsm need openpyxl and .ods needs odfpy.
+    """
+    name = (filename or getattr(source, 'name', None) or str(source)).lower()
+    if name.endswith(('.xlsx', '.xlsm', '.ods')):
+        return pd.read_excel(source)
+    return pd.read_csv(source)
+
+def validate_cohort(cohort, rubric, id_column=None):
+    """
+    Checks every student and section at once. Returns (marks, feedback, errors):
+      marks     float (n_students, n_sections) array, columns in rubric order
+      feedback  object array of the same shape, blank cells filled with default feedback
+      errors    DataFrame of (row, student, section, value, problem), empty when valid
+    Missing columns raise ValueError, since no row could be marked.
+    """
+    sections = list(rubric['sections'])
+    id_column = id_column or cohort.columns[0]
+    missing = [s for s in [id_column] + sections if s not in cohort.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    raw = cohort[sections]
+    marks = raw.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    maxima = np.array([rubric['sections'][s] for s in sections], dtype=np.float64)
+
+    problems = {
+        'not a number': np.isnan(marks) & raw.notna().to_numpy(),
+        'missing': raw.isna().to_numpy(),
+        'negative': marks < 0,
+        'above maximum': marks > maxima + rubric['max_tolerance'] + 1e-9,
+    }
+    step = rubric.get('step')
+    if step:
+        ratio = marks / step
+        problems[f'not a multiple of {step:g}'] = np.abs(ratio - np.round(ratio)) > 1e-6
+
+    students = cohort[id_column].astype(str).to_numpy()
+    duplicated = cohort[id_column].duplicated(keep=False).to_numpy()
+
+    rows, cols, labels = [], [], []
+    for label, mask in problems.items():
+        r, c = np.nonzero(mask)
+        rows.append(r)
+        cols.append(c)
+        labels.append(np.full(len(r), label, dtype=object))
+    rows, cols, labels = np.concatenate(rows), np.concatenate(cols), np.concatenate(labels)
+    errors = pd.DataFrame({
+        'row': rows + 2,  # spreadsheet row number (header is row 1)
+        'student': students[rows],
+        'section': np.array(sections, dtype=object)[cols],
+        'value': raw.to_numpy()[rows, cols],
+        'problem': labels,
+    })
+    if duplicated.any():
+        dup_rows = np.flatnonzero(duplicated)
+        errors = pd.concat([errors, pd.DataFrame({
+            'row': dup_rows + 2, 'student': students[dup_rows], 'section': id_column,
+            'value': students[dup_rows], 'problem': 'duplicate student ID',
+        })], ignore_index=True)
+    errors = errors.sort_values(['row', 'section'], kind='stable').reset_index(drop=True)
+
+    feedback = np.empty(marks.shape, dtype=object)
+    for j, section in enumerate(sections):
+        default = rubric['default_feedback'].get(section, '')
+        column = cohort.get(section + FEEDBACK_SUFFIX)
+        if column is None:
+            feedback[:, j] = default
+        else:
+            text = column.fillna('').astype(str).str.strip()
+            feedback[:, j] = text.where(text != '', default).to_numpy()
+    return marks, feedback, errors
+
+def _safe_filename(student):
+    name = re.sub(r'[^\w.-]+', '_', str(student)).strip('._')
+    return name or 'student'
+
+def _render_chunk(args):
+    """
+    Pool worker: feedback tables for a chunk of students.
+    """
+    students, marks, feedback, sections, mark_format = args
+    tables = []
+    for student, student_marks, student_feedback in zip(students, marks, feedback):
+        marks_awarded = dict(zip(sections, student_marks.tolist()))
+        feedback_given = dict(zip(sections, student_feedback.tolist()))
+        tables.append((student, create_feedback_table(marks_awarded, feedback_given, sections, mark_format)))
+    return tables
+
+def render_feedback_tables(students, marks, feedback, rubric, n_workers=1, chunk_size=50):
+    """
+    Yields (student, feedback table) in cohort order, rendered on `n_workers` processes.
+    """
+    sections = rubric['sections']
+    chunks = [
+        (students[i:i + chunk_size], marks[i:i + chunk_size], feedback[i:i + chunk_size], sections, rubric['mark_format'])
+        for i in range(0, len(students), chunk_size)
+    ]
+    if n_workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _render_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(chunks))) as pool:
+        for tables in pool.map(_render_chunk, chunks):
+            yield from tables
+
+def write_feedback_zip(cohort, rubric, fileobj, id_column=None, n_workers=1, progress=None):
+    """
+    Validates the cohort and, if it is clean, streams one <student>.txt feedback table per
+    row plus summary.csv (student, per-section marks, total) into a zip on `fileobj`.
+    Returns the errors DataFrame; nothing is written when it is not empty.
+    `progress(i, n)` is called after each student.
+    """
+    marks, feedback, errors = validate_cohort(cohort, rubric, id_column)
+    if len(errors):
+        return errors
+
+    id_column = id_column or cohort.columns[0]
+    students = cohort[id_column].astype(str).tolist()
+    sections = list(rubric['sections'])
+
+    used_names = set()
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        tables = render_feedback_tables(students, marks, feedback, rubric, n_workers)
+        for i, (student, table) in enumerate(tables, start=1):
+            name = _safe_filename(student)
+            if name in used_names:  # IDs that only differ in stripped characters
+                name = f"{name}_{i}"
+            used_names.add(name)
+            archive.writestr(f"{name}.txt", table)
+            if progress is not None:
+                progress(i, len(students))
+
+        summary = pd.DataFrame(marks, columns=sections)
+        summary.insert(0, id_column, students)
+        summary['Total'] = marks.sum(axis=1)
+        archive.writestr("summary.csv", summary.to_csv(index=False))
+    return errors
+
+def cohort_template(rubric, n_rows=3):
+    """
+    Empty cohort CSV with the columns a rubric expects.
+    """
+    columns = ['Student']
+    for section in rubric['sections']:
+        columns += [section, section + FEEDBACK_SUFFIX]
+    return pd.DataFrame([[''] * len(columns)] * n_rows, columns=columns).to_csv(index=False)
+
+def main():
+    st.title("Batch Marking")
+    st.markdown("""
+    Mark a whole cohort at once: pick the rubric of the lab, upload a CSV or spreadsheet
+    with one row per student, and download every feedback table in one zip.
+    """)
+
+    rubrics = bundled_rubrics()
+    rubric_choice = st.selectbox("Rubric", list(rubrics) + ["Upload a rubric (JSON)"])
+    if rubric_choice in rubrics:
+        rubric = load_rubric(rubrics[rubric_choice])
+    else:
+        rubric_file = st.file_uploader("Rubric JSON", type=["json"])
+        if rubric_file is None:
+            st.stop()
+        try:
+            rubric = load_rubric(rubric_file)
+        except (ValueError, json.JSONDecodeError) as e:
+            st.error(f"Invalid rubric: {e}")
+            st.stop()
+
+    st.caption(f"{rubric['title']}: " + ", ".join(f"{s} ({m})" for s, m in rubric['sections'].items()))
+    st.download_button(
+        label="Download cohort template (CSV)",
+        data=cohort_template(rubric),
+        file_name="cohort_template.csv",
+        mime="text/csv"
+    )
+
+    cohort_file = st.file_uploader("Cohort marks", type=["csv", "xlsx", "xlsm", "ods"])
+    n_workers = st.number_input(
+        "Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+        help="Renders feedback tables on a process pool."
+    )
+    if cohort_file is None:
+        return
+
+    try:
+        cohort = read_cohort(cohort_file)
+    except Exception as e:
+        st.error(f"Could not read the cohort file: {e}")
+        return
+    id_column = st.selectbox("Student ID column", list(cohort.columns))
+
+    if st.button("Mark cohort"):
+        progress = st.progress(0.0, text="Rendering feedback tables...")
+
+        def report(i, n):
+            progress.progress(i / n, text=f"Rendered {i} of {n} feedback tables")
+
+        buffer = io.BytesIO()
+        try:
+            errors = write_feedback_zip(cohort, rubric, buffer, id_column=id_column, n_workers=n_workers,
+                                        progress=report)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        if len(errors):
+            progress.empty()
+            st.error(f"{len(errors)} problems found; fix them and upload again.")
+            st.dataframe(errors, use_container_width=True)
+        else:
+            st.success(f"Marked {len(cohort)} students.")
+            st.download_button(
+                label="Download feedback (ZIP)",
+                data=buffer.getvalue(),
+                file_name="feedback.zip",
+                mime="application/zip"
+            )
+
+if __name__ == "__main__":
+    main()
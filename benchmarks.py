@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import sequence_scoring as ss
+
+AMINO_ACIDS = np.frombuffer(b'ACDEFGHIKLMNPQRSTVWY', dtype=np.uint8)
+
+# Partial queries of increasing selectivity (each constrained position keeps ~1/20 of
+# uniform synthetic rows): N-X-T, then S at -1, then A at +3
+QUERIES = {
+    '1-pos': ('', '', '', '', '', 'N', '', 'T', '', '', '', '', ''),
+    '2-pos': ('', '', '', '', 'S', 'N', '', 'T', '', '', '', '', ''),
+    '3-pos': ('', '', '', '', 'S', 'N', '', 'T', 'A', '', '', '', ''),
+}
+
+def check_score_regression(n_cases=200, seed=0):
+    """
+    Regression check of closed_form_score against the trapezoid score app.py used
+    (compute_score on seaborn's 200-point KDE grid), and against a fine grid wide
+    enough to hold both the KDE and the kernel, where the trapezoid error vanishes.
+    The 200-point score also loses the mass cut off by seaborn's plot range, so
+    only the fine-grid comparison is asserted.
+    """
+    rng = np.random.default_rng(seed)
+    worst_default = worst_fine = 0.0
+    for _ in range(n_cases):
+        n = int(rng.integers(2, 2000))
+        data = rng.normal(rng.uniform(-3, 3), rng.uniform(0.1, 2.0), n)
+        x0 = rng.uniform(-3, 3)
+        sigma = rng.uniform(0.05, 0.5)
+
+        exact = ss.closed_form_score(data, x0, sigma)
+
+        x, f = ss.kde_fft(data, bw_adjust=0.5)  # seaborn's grid
+        default = ss.compute_score(f, x, x0, sigma)
+        h = ss.kde_bandwidth(data, 0.5)
+        grid = np.linspace(min(data.min() - 8 * h, x0 - 8 * sigma), max(data.max() + 8 * h, x0 + 8 * sigma), 20000)
+        x, f = ss.kde_fft(data, bw_adjust=0.5, grid=grid)
+        fine = ss.compute_score(f, x, x0, sigma)
+
+        # Absolute floor for scores that are ~0 because x0 sits far from the data
+        worst_default = max(worst_default, abs(default - exact) / max(exact, 1e-3))
+        worst_fine = max(worst_fine, abs(fine - exact) / max(exact, 1e-3))
+
+    print(f"closed form vs 200-point trapezoid: max rel. error {worst_default:.2e}")
+    print(f"closed form vs fine-grid trapezoid: max rel. error {worst_fine:.2e}")
+    assert worst_fine < 1e-3, "closed_form_score disagrees with the trapezoid score"
+    return worst_default, worst_fine
+
+def check_baseline_score(data_path=ss.DEFAULT_DATA, queries=QUERIES):
+    """
+    Regression check of the score app.py shows against the original app's score:
+    seaborn's kdeplot line for the matching PCA1 values, integrated with compute_score
+    at the pocket. Runs the queries on the dataset at `data_path`, or on a synthetic
+    dataset when that file is not present.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    if os.path.exists(data_path):
+        import pandas as pd
+        data = pd.read_csv(data_path, usecols=['Surrounding_sequence', 'PCA1'])
+        sequences, pca1 = data['Surrounding_sequence'].tolist(), data['PCA1'].to_numpy()
+    else:
+        sequences, pca1 = synthetic_dataset(100_000)
+    index = ss.SequenceIndex(sequences, pca1)
+
+    worst = 0.0
+    for name, query in queries.items():
+        matches = index.match_pca1(query)
+        if len(matches) < 2:
+            continue
+        kde_plot = sns.kdeplot(matches, bw_adjust=ss.BW_ADJUST)
+        x_values, kde_values = kde_plot.get_lines()[0].get_data()
+        plt.close()
+        baseline = ss.compute_score(kde_values, x_values, ss.POCKET_MEAN, ss.SIGMA)
+        score = ss.closed_form_score(matches, ss.POCKET_MEAN, ss.SIGMA, bw_adjust=ss.BW_ADJUST)
+        error = abs(score - baseline) / max(baseline, 1e-3)
+        print(f"{name}: {len(matches)} matches, seaborn score {baseline:.6g}, score {score:.6g}, rel. error {error:.2e}")
+        worst = max(worst, error)
+    assert worst < 1e-3, "score differs from the seaborn-based baseline score"
+    return worst
+
+def synthetic_dataset(n_rows, seed=0):
+    """
+    Uniform random 13-residue windows with the N at the center and a PCA1 column.
+    """
+    rng = np.random.default_rng(seed)
+    codes = AMINO_ACIDS[rng.integers(0, len(AMINO_ACIDS), size=(n_rows, ss.WINDOW_LENGTH))]
+    codes[:, ss.CENTER] = ord('N')
+    sequences = codes.view(f'S{ss.WINDOW_LENGTH}').ravel().astype(str).tolist()
+    pca1 = rng.normal(1.0, 1.0, n_rows)
+    return sequences, pca1
+
+def _measure(func, repeat=1):
+    """
+    Runs `func` `repeat` times; returns (result, best seconds, peak bytes allocated during
+    a traced extra call). Timing runs are untraced, since tracemalloc slows allocation.
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - t0)
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def benchmark_pipeline(sizes=(10_000, 100_000, 1_000_000, 10_000_000), queries=QUERIES, scan_limit=1_000_000,
+                       repeat=3, out=sys.stdout):
+    """
+    Times every stage of the app.py scoring pipeline on synthetic datasets:
+    index build, the reference partial_sequence_match scan (skipped above `scan_limit`
+    rows), match_pca1 (index lookup), get_kde_values (binned FFT KDE),
+    compute_score (grid trapezoid) and closed_form_score.
+    Writes one JSON object per (size, query, stage) to `out`, with the best of `repeat`
+    timings, items/s throughput and peak traced memory, and returns the records.
+    """
+    records = []
+
+    def emit(n_rows, query, stage, seconds, peak, n_items, n_matches=None):
+        record = {
+            'stage': stage,
+            'n_rows': n_rows,
+            'query': query,
+            'n_matches': n_matches,
+            'selectivity': None if n_matches is None else n_matches / n_rows,
+            'seconds': seconds,
+            'throughput': n_items / seconds if seconds > 0 else None,
+            'peak_bytes': peak,
+        }
+        records.append(record)
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+
+    def run_size(n_rows):
+        # Locals, so each dataset and index is freed before the next size is generated
+        sequences, pca1 = synthetic_dataset(n_rows)
+
+        index, seconds, peak = _measure(lambda: ss.SequenceIndex(sequences, pca1), repeat)
+        emit(n_rows, None, 'index_build', seconds, peak, n_rows)
+
+        for name, query in queries.items():
+            if n_rows <= scan_limit:
+                scanned, seconds, peak = _measure(lambda: ss.partial_sequence_match(query, sequences), repeat)
+                emit(n_rows, name, 'partial_sequence_match', seconds, peak, n_rows, len(scanned))
+
+            matches, seconds, peak = _measure(lambda: index.match_pca1(query), repeat)
+            n_matches = len(matches)
+            emit(n_rows, name, 'match_pca1', seconds, peak, n_rows, n_matches)
+
+            (x, f), seconds, peak = _measure(lambda: ss.kde_fft(matches, bw_adjust=ss.BW_ADJUST), repeat)
+            emit(n_rows, name, 'get_kde_values', seconds, peak, n_matches, n_matches)
+
+            if len(x):
+                _, seconds, peak = _measure(lambda: ss.compute_score(f, x, ss.POCKET_MEAN, ss.SIGMA), repeat)
+                emit(n_rows, name, 'compute_score', seconds, peak, n_matches, n_matches)
+
+            _, seconds, peak = _measure(lambda: ss.closed_form_score(matches, ss.POCKET_MEAN, ss.SIGMA), repeat)
+            emit(n_rows, name, 'closed_form_score', seconds, peak, n_matches, n_matches)
+
+    for n_rows in sizes:
+        run_size(n_rows)
+    return records
+
+def synthetic_pdb(n_atoms, seed=0):
+    """
+    PDB text (bytes) of `n_atoms` ATOM records over chains A-Z with random B-factors.
+    """
+    rng = np.random.default_rng(seed)
+    atom_names = [' N  ', ' CA ', ' C  ', ' O  ', ' CB ']
+    lines = []
+    for i in range(n_atoms):
+        chain = chr(ord('A') + (i // 50000) % 26)
+        lines.append(
+            f"ATOM  {(i + 1) % 100000:>5} {atom_names[i % 5]} ALA {chain}{(i // 5) % 10000:>4}    "
+            f"{rng.uniform(-50, 50):8.3f}{rng.uniform(-50, 50):8.3f}{rng.uniform(-50, 50):8.3f}"
+            f"  1.00{rng.uniform(0, 99):6.2f}           C  "
+        )
+    return ('\n'.join(lines) + '\nEND\n').encode()
+
+def benchmark_parallel_parsing(workers=(1, 2, 4, 8), n_files=32, n_atoms=100_000, out=sys.stdout):
+    """
+    Wall-clock time of averageSASA's ingest (parse + Welford update of every file)
+    against parser worker count. One JSON object per worker count.
+    """
+    import averageSASA
+
+    contents = [synthetic_pdb(n_atoms, seed=i) for i in range(n_files)]
+    template = averageSASA.read_bfactor_table(contents[0])
+    records = []
+    for n_workers in workers:
+        t0 = time.perf_counter()
+        stats = averageSASA.BFactorStats(template)
+        for table in averageSASA.iter_bfactor_arrays(contents, n_workers):
+            stats.update(table)
+        seconds = time.perf_counter() - t0
+        record = {
+            'stage': 'average_bfactors',
+            'n_workers': n_workers,
+            'n_files': n_files,
+            'n_atoms': n_atoms,
+            'seconds': seconds,
+            'throughput': n_files / seconds,
+        }
+        records.append(record)
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+    return records
+
+def benchmark_pdb_reader(n_atoms=100_000, repeat=3, out=sys.stdout):
+    """
+    Time to get coordinates and B-factors of a synthetic `n_atoms` PDB with the shared
+    fixed-column reader, Biopython's PDBParser and mdtraj.load. Libraries that are not
+    installed are skipped. One JSON object per reader.
+    """
+    import os
+    import tempfile
+    import pdb_reader
+
+    def read_fixed_columns(path):
+        atoms = pdb_reader.read_atoms(path)
+        return atoms['xyz'], atoms['bfactor']
+
+    def read_biopython(path):
+        from Bio.PDB import PDBParser
+        structure = PDBParser(QUIET=True).get_structure('s', path)
+        atoms = list(structure.get_atoms())
+        return np.array([a.coord for a in atoms]), np.array([a.bfactor for a in atoms])
+
+    def read_mdtraj(path):
+        import mdtraj as md
+        return md.load(path).xyz[0] * 10.0, None  # MDTraj does not expose B-factors
+
+    readers = {'pdb_reader': read_fixed_columns, 'biopython': read_biopython, 'mdtraj': read_mdtraj}
+    fd, path = tempfile.mkstemp(suffix='.pdb')
+    records = []
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(synthetic_pdb(n_atoms))
+        reference, _ = read_fixed_columns(path)
+        for name, reader in readers.items():
+            try:
+                (xyz, _), seconds, peak = _measure(lambda: reader(path), repeat)
+            except ImportError:
+                continue
+            record = {
+                'stage': 'read_pdb',
+                'reader': name,
+                'n_atoms': n_atoms,
+                'seconds': seconds,
+                'throughput': n_atoms / seconds,
+                'peak_bytes': peak,
+                'max_xyz_diff': float(np.abs(np.asarray(xyz, dtype=np.float64) - reference).max()),
+            }
+            records.append(record)
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        os.remove(path)
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring pipeline benchmarks and regression checks.")
+    parser.add_argument('--sizes', default='10000,100000,1000000,10000000',
+                        help="Comma-separated synthetic dataset sizes (rows)")
+    parser.add_argument('--scan-limit', type=int, default=1_000_000,
+                        help="Largest dataset the reference linear scan is timed on")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage (best is reported)")
+    parser.add_argument('--output', default=None, help="JSON-lines output file (default: stdout)")
+    parser.add_argument('--skip-regression', action='store_true', help="Do not run check_score_regression and check_baseline_score")
+    parser.add_argument('--parsing', action='store_true',
+                        help="Benchmark averageSASA PDB ingest against worker count instead")
+    parser.add_argument('--workers', default='1,2,4,8', help="Comma-separated worker counts for --parsing")
+    parser.add_argument('--pdb-reader', action='store_true',
+                        help="Benchmark the fixed-column PDB reader against Biopython and MDTraj instead")
+    args = parser.parse_args()
+
+    if args.pdb_reader:
+        benchmark_pdb_reader(repeat=args.repeat)
+        return
+
+    if args.parsing:
+        workers = [int(w) for w in args.workers.split(',') if w.strip()]
+        benchmark_parallel_parsing(workers)
+        return
+
+    if not args.skip_regression:
+        check_score_regression()
+        check_baseline_score()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if args.output:
+        with open(args.output, 'w') as out:
+            benchmark_pipeline(sizes, scan_limit=args.scan_limit, repeat=args.repeat, out=out)
+    else:
+        benchmark_pipeline(sizes, scan_limit=args.scan_limit, repeat=args.repeat)
+
+if __name__ == "__main__":
+    main()
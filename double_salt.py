@@ -1,69 +1,16 @@
 import streamlit as st
 
-# Define the sections and their maximum marks for the Double Salt experiment
-sections = {
-    "DOUBLE SALT DEFINITION": 8,
-    "LATTICE ENERGY DEFINITION": 8,
-    "FORMATION EQUATION": 4,
-    "YIELD CALCULATION": 25,
-    "TAN PRECIPITATE EQUATION": 10,
-    "COPPER PERCENTAGE": 20,
-    "THEORETICAL %Cu": 10,
-    "FREE ENERGY AND ENTHALPY CHANGE": 15
-}
+from batch_marking import bundled_rubrics, create_feedback_table, load_rubric
 
-# Dummy feedback for each section, ideally customized based on common issues or expectations
-dummy_feedback = {
-    "DOUBLE SALT DEFINITION": "Correctly explained the concept of a Double Salt.",
-    "LATTICE ENERGY DEFINITION": "Accurately defined Lattice Energy with appropriate examples.",
-    "FORMATION EQUATION": "Equation for the formation is correctly written and balanced.",
-    "YIELD CALCULATION": "Yield calculation is correct and clearly articulated.",
-    "TAN PRECIPITATE EQUATION": "Reaction equation for the formation of tan precipitate is accurate.",
-    "COPPER PERCENTAGE": "Correctly calculated the percentage of copper in the sample.",
-    "THEORETICAL %Cu": "Comparison between theoretical and experimental copper percentage is well analyzed.",
-    "FREE ENERGY AND ENTHALPY CHANGE": "Correctly calculated the free energy and enthalpy changes for the reaction."
-}
-
-# Function to create a well-aligned feedback table
-def create_feedback_table(marks_awarded, feedback_given, sections):
-    section_width = max(len(s) for s in sections) + 2  # Longest section name + padding
-    marks_width = 10  # "x.x/xx" format
-    feedback_width = 60  # Fixed width for feedback
-
-    header = (
-        f"| {'Section'.ljust(section_width)} | "
-        f"{'Marks'.center(marks_width)} | "
-        f"{'Feedback'.ljust(feedback_width)} |\n"
-        f"|{'-' * section_width}|{'-' * marks_width}|{'-' * feedback_width}|\n"
-    )
-
-    rows = ""
-    for section, max_mark in sections.items():
-        marks_str = f"{marks_awarded[section]:.1f}/{max_mark:.1f}"
-        rows += (
-            f"| {section.ljust(section_width)} | "
-            f"{marks_str.center(marks_width)} | "
-            f"{feedback_given[section].ljust(feedback_width)} |\n"
-        )
-    
-    total_marks = sum(marks_awarded.values())
-    total_max = sum(sections.values())
-    total_marks_str = f"{total_marks:.1f}/{total_max:.1f}"
-    
-    footer = (
-        f"| {'Total'.ljust(section_width)} | "
-        f"{total_marks_str.center(marks_width)} | "
-        f"{' ' * feedback_width} |\n"
-        f"|{'=' * (section_width + marks_width + feedback_width + 5)}|\n"
-    )
-
-    feedback_table = header + rows + footer
-
-    return feedback_table
+# Sections, maximum marks and default feedback are defined in rubrics/double_salt.json,
+# which batch_marking.py also marks whole cohorts against
+rubric = load_rubric(bundled_rubrics()["double_salt.json"])
+sections = rubric['sections']
+dummy_feedback = rubric['default_feedback']
 
 # Streamlit form for input
 with st.form(key='feedback_form'):
-    st.title('Double Salt Experiment Feedback Form')
+    st.title(rubric['title'])
 
     marks_awarded = {}
     feedback_given = {}
@@ -78,5 +25,5 @@ with st.form(key='feedback_form'):
     submitted = st.form_submit_button("Submit")
 
 if submitted:
-    feedback_table = create_feedback_table(marks_awarded, feedback_given, sections)
+    feedback_table = create_feedback_table(marks_awarded, feedback_given, sections, rubric['mark_format'])
     st.code(feedback_table)
\ No newline at end of file
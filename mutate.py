@@ -2,47 +2,173 @@ import streamlit as st
 from io import StringIO, BytesIO
 import tempfile
 import os
-from pymol import cmd, finish_launching
 import shutil
+import zipfile
+import numpy as np
+from pdb_reader import ATOM_RECORDS, CHAIN, RESNAME, RESSEQ, PDBText
+from mutation_pool import MutationPool
+from mutation_cache import MutationCache, content_hash, normalize_mutations
 
-# Initialize PyMOL
-# finish_launching(['pymol', '-cq'])  # '-c' for no GUI, '-q' for quiet
+AMINO_ACIDS = [
+    'ALA', 'ARG', 'ASN', 'ASP', 'CYS',
+    'GLN', 'GLU', 'GLY', 'HIS', 'ILE',
+    'LEU', 'LYS', 'MET', 'PHE', 'PRO',
+    'SER', 'THR', 'TRP', 'TYR', 'VAL'
+]
 
 def get_residues(pdb_content):
     """
     Parses the PDB content and extracts a list of residues.
-    Returns a list of tuples: (chain, residue number, residue name).
-    """
-    residues = []
-    for line in pdb_content.splitlines():
-        if line.startswith("ATOM") or line.startswith("HETATM"):
-            chain = line[21]
-            res_num = line[22:26].strip()
-            res_name = line[17:20].strip()
-            residue = (chain, res_num, res_name)
-            if residue not in residues:
-                residues.append(residue)
-    return residues
-
-def perform_mutation(pdb_path, mutations, output_path):
-    """
-    Uses PyMOL to mutate multiple residues to new residues and saves the result.
-    `mutations` is a list of tuples in the format (chain, res_num, new_res).
-    """
-    try:
-        cmd.load(pdb_path, 'structure')
-        for mutation in mutations:
-            chain, res_num, new_res = mutation
-            selection = f'/structure//{chain}/{res_num}/'
-            cmd.wizard("mutagenesis")
-            cmd.refresh_wizard()
-            cmd.get_wizard().set_mode(new_res)
-            cmd.get_wizard().do_select(selection)
-            cmd.get_wizard().apply()
-        cmd.save(output_path)  # Save the final mutated file
-        cmd.delete('all')  # Clean up PyMOL session
-    except Exception as e:
-        raise RuntimeError(f"Error in PyMOL mutation: {e}")
+    Returns a list of tuples: (chain, residue number, residue name), in file order.
+    """
+    with PDBText(pdb_content.encode('utf-8')) as pdb:
+        lines = pdb.find(ATOM_RECORDS)
+        chains = pdb.field(*CHAIN, lines)
+        res_nums = np.char.strip(pdb.field(*RESSEQ, lines))
+        res_names = np.char.strip(pdb.field(*RESNAME, lines))
+
+    # First occurrence of each (chain, residue number, residue name), in file order
+    keys = np.char.add(np.char.add(np.char.add(chains, b'|'), np.char.add(res_nums, b'|')), res_names)
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    return [(chains[i].decode(), res_nums[i].decode(), res_names[i].decode()) for i in first.tolist()]
+
+def saturation_variants(residues, chain, start, end):
+    """
+    Single-mutant variants replacing every residue of `chain` numbered start..end
+    (inclusive) with each of the 19 other amino acids.
+    `residues` is the get_residues list; non-numeric residue numbers are skipped.
+    """
+    variants = []
+    for res_chain, res_num, res_name in residues:
+        if res_chain != chain or not res_num.lstrip('-').isdigit() or not start <= int(res_num) <= end:
+            continue
+        variants.extend([(res_chain, res_num, new_res)] for new_res in AMINO_ACIDS if new_res != res_name)
+    return variants
+
+def parse_variant_specs(text, residues):
+    """
+    One variant per line, mutations separated by ',' or ';' as CHAIN:RESNUM:NEWRES,
+    e.g. "A:41:GLY, A:45:TRP". A line "CHAIN:START-END:*" expands to a saturation scan.
+    Returns a list of variants (lists of (chain, res_num, new_res)).
+    """
+    variants = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        variant = []
+        for item in line.replace(';', ',').split(','):
+            parts = [p.strip() for p in item.split(':')]
+            if len(parts) != 3 or not all(parts):
+                raise ValueError(f"Line {line_number}: expected CHAIN:RESNUM:NEWRES, got '{item.strip()}'")
+            chain, res_num, new_res = parts[0], parts[1], parts[2].upper()
+            if new_res == '*':
+                start, _, end = res_num.partition('-')
+                variants.extend(saturation_variants(residues, chain, int(start), int(end or start)))
+                continue
+            if new_res not in AMINO_ACIDS:
+                raise ValueError(f"Line {line_number}: unknown residue '{new_res}'")
+            variant.append((chain, res_num, new_res))
+        if variant:
+            variants.append(variant)
+    return variants
+
+def variant_name(variant, residues=None):
+    """
+    File-name friendly label, e.g. "A-M41G+A-L45W" (one-letter codes when the original
+    residue is known from `residues`).
+    """
+    one_letter = dict(zip(AMINO_ACIDS, 'ARNDCQEGHILKMFPSTWYV'))
+    original = {(c, n): r for c, n, r in residues or []}
+    labels = []
+    for chain, res_num, new_res in variant:
+        old = one_letter.get(original.get((chain, res_num)), '')
+        labels.append(f"{chain.strip() or '_'}-{old}{res_num}{one_letter.get(new_res, new_res)}")
+    return '+'.join(labels)
+
+def write_variants_zip(results, fileobj, residues=None, progress=None, n_variants=None):
+    """
+    Streams (variant, pdb string) pairs into a zip archive on `fileobj`, one PDB per
+    variant, so only the archive (not every structure) is held at once.
+    `progress(i, n)` is called after each variant. Returns the number written.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for variant, pdb_string in results:
+            archive.writestr(f"{variant_name(variant, residues)}.pdb", pdb_string)
+            count += 1
+            if progress is not None:
+                progress(count, n_variants)
+    return count
+
+# One pool of PyMOL worker processes shared by all sessions; each job runs in a
+# worker's own PyMOL instance, so concurrent users never share a `cmd` session
+@st.cache_resource
+def get_mutation_pool():
+    return MutationPool()
+
+# Mutated structures keyed by upload content + mutation set, shared across sessions
+@st.cache_resource
+def get_mutation_cache():
+    return MutationCache()
+
+def cached_mutation(pdb_content, mutations, pool, cache, workdir):
+    """
+    Mutated PDB string for one mutation set. A cached result is returned as is;
+    otherwise the largest cached subset (or the upload) is the starting structure
+    and only the missing mutations are applied. The result is cached.
+    """
+    pdb_hash = content_hash(pdb_content)
+    pdb_string = cache.get(pdb_hash, mutations)
+    if pdb_string is not None:
+        return pdb_string
+
+    applied, base = cache.best_base(pdb_hash, mutations)
+    remaining = [m for m in normalize_mutations(mutations) if m not in applied]
+    base_path = os.path.join(workdir, f"base_{len(applied)}.pdb")
+    with open(base_path, 'w') as f:
+        f.write(base if base is not None else pdb_content)
+    result_path = pool.submit(base_path, [remaining], workdir).result()[0]
+    with open(result_path) as f:
+        pdb_string = f.read()
+    os.remove(result_path)
+    cache.put(pdb_hash, mutations, pdb_string)
+    return pdb_string
+
+def cached_variants(pdb_content, variants, pool, cache, workdir):
+    """
+    Yields (variant, PDB string) in order. Variants missing from the cache run on the
+    pool in parallel (from the upload) and are added to the cache as they arrive.
+    """
+    pdb_hash = content_hash(pdb_content)
+    missing = [i for i, variant in enumerate(variants) if not cache.contains(pdb_hash, variant)]
+    pdb_path = os.path.join(workdir, 'original.pdb')
+    with open(pdb_path, 'w') as f:
+        f.write(pdb_content)
+    computed = read_variant_files(pool.map_variants(pdb_path, [variants[i] for i in missing], workdir))
+
+    missing = set(missing)
+    for i, variant in enumerate(variants):
+        if i in missing:
+            _, pdb_string = next(computed)
+            cache.put(pdb_hash, variant, pdb_string)
+        else:
+            pdb_string = cache.get(pdb_hash, variant)
+            if pdb_string is None:  # evicted since the lookup
+                pdb_string = cached_mutation(pdb_content, variant, pool, cache, workdir)
+        yield variant, pdb_string
+
+def read_variant_files(results):
+    """
+    Turns pool results (variant, output path) into (variant, PDB string), removing
+    each temp file once read.
+    """
+    for variant, path in results:
+        with open(path) as f:
+            pdb_string = f.read()
+        os.remove(path)
+        yield variant, pdb_string
 
 def main():
     st.title("PDB Residue Mutator (Multiple Mutations)")
@@ -72,46 +198,65 @@ def main():
                 res_num = parts[1].split()[-1].strip()
 
                 # Select a mutation for each selected residue
-                amino_acids = [
-                    'ALA', 'ARG', 'ASN', 'ASP', 'CYS',
-                    'GLN', 'GLU', 'GLY', 'HIS', 'ILE',
-                    'LEU', 'LYS', 'MET', 'PHE', 'PRO',
-                    'SER', 'THR', 'TRP', 'TYR', 'VAL'
-                ]
-                new_residue = st.selectbox(f"Select mutation for Chain {chain}, Residue {res_num}", amino_acids, key=f"{chain}_{res_num}")
+                new_residue = st.selectbox(f"Select mutation for Chain {chain}, Residue {res_num}", AMINO_ACIDS, key=f"{chain}_{res_num}")
                 mutation_combos.append((chain, res_num, new_residue))
 
             if st.button("Mutate"):
                 with st.spinner('Performing mutations...'):
                     # Create a temporary directory
                     with tempfile.TemporaryDirectory() as tmpdirname:
-                        pdb_path = os.path.join(tmpdirname, 'original.pdb')
-                        mutated_pdb_path = os.path.join(tmpdirname, 'mutated.pdb')  # Define mutated file path here
-
-                        # Write the original PDB to the temporary directory
-                        with open(pdb_path, 'w') as f:
-                            f.write(pdb_content)
-
                         try:
-                            # Perform mutations one by one
-                            perform_mutation(pdb_path, mutation_combos, mutated_pdb_path)
-
-                            # Ensure the mutated file exists before trying to read it
-                            if os.path.exists(mutated_pdb_path):
-                                with open(mutated_pdb_path, 'rb') as f:
-                                    mutated_pdb = f.read()
-
-                                st.success("Mutation successful!")
-                                st.download_button(
-                                    label="Download Mutated PDB",
-                                    data=mutated_pdb,
-                                    file_name='mutated.pdb',
-                                    mime='chemical/x-pdb'
-                                )
-                            else:
-                                st.error("The mutated PDB file could not be found.")
+                            # All mutations as one variant, on a pooled PyMOL worker, unless cached
+                            mutated_pdb = cached_mutation(pdb_content, mutation_combos, get_mutation_pool(),
+                                                          get_mutation_cache(), tmpdirname)
+
+                            st.success("Mutation successful!")
+                            st.download_button(
+                                label="Download Mutated PDB",
+                                data=mutated_pdb,
+                                file_name='mutated.pdb',
+                                mime='chemical/x-pdb'
+                            )
                         except Exception as e:
                             st.error(f"An error occurred during mutation: {e}")
 
+        # Many variants from one upload: explicit lists and saturation scans, one zip
+        st.subheader("Batch / Saturation Mutagenesis")
+        spec_text = st.text_area(
+            "Variants (one per line)",
+            placeholder="A:41:GLY, A:45:TRP\nA:10-20:*",
+            help="Mutations of one variant are separated by commas (CHAIN:RESNUM:NEWRES). "
+                 "CHAIN:START-END:* mutates every residue in the range to all 19 alternatives."
+        )
+        if st.button("Run batch"):
+            try:
+                variants = parse_variant_specs(spec_text, residues)
+            except ValueError as e:
+                st.error(str(e))
+                variants = []
+            if variants:
+                progress = st.progress(0.0, text=f"Mutating 0 of {len(variants)} variants...")
+
+                def report(i, n):
+                    progress.progress(i / n, text=f"Mutating {i} of {n} variants...")
+
+                buffer = BytesIO()
+                try:
+                    # Variant chunks run in parallel on the worker pool; outputs come back as temp files
+                    with tempfile.TemporaryDirectory() as tmpdirname:
+                        results = cached_variants(pdb_content, variants, get_mutation_pool(),
+                                                  get_mutation_cache(), tmpdirname)
+                        n_written = write_variants_zip(results, buffer, residues,
+                                                       progress=report, n_variants=len(variants))
+                    st.success(f"{n_written} variants generated.")
+                    st.download_button(
+                        label="Download Variants (ZIP)",
+                        data=buffer.getvalue(),
+                        file_name='variants.zip',
+                        mime='application/zip'
+                    )
+                except Exception as e:
+                    st.error(f"An error occurred during batch mutation: {e}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,148 @@
+"""
+Content-addressed on-disk cache of mutated structures.
+
+An entry is keyed by the SHA-256 of the uploaded PDB plus the normalized, sorted
+mutation set, and stored as <key>.pdb. Access refreshes the file's mtime, so the
+directory is LRU-ordered by mtime, and it is trimmed to a byte budget whenever an
+insert takes the running total over it.
+Partially cached work is reused: for a set that is not cached, the largest
+cached subset is found and only the remaining mutations are applied to it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from itertools import combinations
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mutation_cache")
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+def content_hash(pdb_content):
+    """
+    SHA-256 of the uploaded PDB text.
+    """
+    if isinstance(pdb_content, str):
+        pdb_content = pdb_content.encode('utf-8')
+    return hashlib.sha256(pdb_content).hexdigest()
+
+def normalize_mutations(mutations):
+    """
+    Canonical form of a mutation set: stripped fields, upper-case residue names,
+    one mutation per (chain, residue) (the last one wins), sorted.
+    """
+    by_site = {}
+    for chain, res_num, new_res in mutations:
+        by_site[(str(chain), str(res_num).strip())] = str(new_res).strip().upper()
+    return tuple(sorted((chain, res_num, new_res) for (chain, res_num), new_res in by_site.items()))
+
+class MutationCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_subset_lookups=256):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_subset_lookups = max_subset_lookups
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # Running size of the directory, so inserts under the budget skip the scan
+        self.current_bytes = sum(size for _, size, _ in self._entries())
+
+    def key(self, pdb_hash, mutations):
+        payload = json.dumps([pdb_hash, normalize_mutations(mutations)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, pdb_hash, mutations):
+        return os.path.join(self.cache_dir, f"{self.key(pdb_hash, mutations)}.pdb")
+
+    def contains(self, pdb_hash, mutations):
+        return os.path.exists(self.path(pdb_hash, mutations))
+
+    def get(self, pdb_hash, mutations):
+        """
+        Cached PDB string for the mutation set, or None. A hit becomes most recently used.
+        """
+        path = self.path(pdb_hash, mutations)
+        try:
+            with open(path) as f:
+                pdb_string = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return pdb_string
+
+    def put(self, pdb_hash, mutations, pdb_string):
+        """
+        Stores a result (atomic rename) and adds its size to the running total. The
+        directory is only scanned, to evict least recently used entries, once the
+        total goes over the budget.
+        """
+        path = self.path(pdb_hash, mutations)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(pdb_string)
+        size = os.path.getsize(tmp_path)
+        with self.lock:
+            try:
+                old_size = os.path.getsize(path)
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            self.current_bytes += size - old_size
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pdb'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """
+        Removes least recently used entries until the directory fits the budget.
+        """
+        with self.lock:
+            self._evict()
+
+    def _evict(self):
+        # The scan also resyncs the running total with the directory
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.current_bytes = total
+
+    def best_base(self, pdb_hash, mutations):
+        """
+        Largest cached proper subset of `mutations` as (subset, PDB string), or
+        ((), None) when nothing is cached. Subsets are tried from the largest down,
+        at most `max_subset_lookups` of them; each miss is a single stat, and only
+        the hit is read.
+        """
+        mutations = normalize_mutations(mutations)
+        lookups = 0
+        for size in range(len(mutations) - 1, 0, -1):
+            for subset in combinations(mutations, size):
+                if lookups >= self.max_subset_lookups:
+                    return (), None
+                lookups += 1
+                if not self.contains(pdb_hash, subset):
+                    continue
+                pdb_string = self.get(pdb_hash, subset)
+                if pdb_string is not None:  # None if evicted since the stat
+                    return subset, pdb_string
+        return (), None
+
+    def stats(self):
+        sizes = [e.stat().st_size for e in os.scandir(self.cache_dir) if e.name.endswith('.pdb')]
+        return {'entries': len(sizes), 'bytes': sum(sizes), 'max_bytes': self.max_bytes}
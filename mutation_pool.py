@@ -0,0 +1,146 @@
+"""
+Pool of isolated PyMOL worker processes for mutation jobs.
+
+PyMOL's `cmd` is a process-wide singleton, so mutations from concurrent Streamlit
+sessions must not share one interpreter. Each worker here is a spawned process with
+its own PyMOL instance. Jobs wait in one queue, and a dispatcher thread per worker
+sends them over a pipe. Inputs and outputs are handed over as temp files, so only
+paths cross process boundaries. A job that runs past its timeout gets its worker
+killed and replaced.
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future
+
+DEFAULT_TIMEOUT = 120.0  # seconds per job
+
+def _worker_main(conn):
+    """
+    Worker loop: receives (pdb_path, variants, out_dir), writes one PDB per variant
+    to out_dir and replies ('ok', paths) or ('error', message). None stops the worker.
+    """
+    # Imported here so every worker process initializes its own PyMOL; the module has
+    # no Streamlit import, so the mutate.py page is never loaded in a worker
+    import pymol_mutagenesis
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        pdb_path, variants, out_dir = message
+        try:
+            with open(pdb_path) as f:
+                pdb_content = f.read()
+            paths = []
+            for variant, pdb_string in pymol_mutagenesis.mutate_batch(pdb_content, variants):
+                path = os.path.join(out_dir, f"{uuid.uuid4().hex}.pdb")
+                with open(path, 'w') as out:
+                    out.write(pdb_string)
+                paths.append(path)
+            conn.send(('ok', paths))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+class MutationPool:
+    """
+    Runs pymol_mutagenesis.mutate_batch jobs on `n_workers` PyMOL processes.
+    Thread-safe: submit() may be called from any number of sessions at once.
+    """
+    def __init__(self, n_workers=None, timeout=DEFAULT_TIMEOUT):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.context = mp.get_context('spawn')  # never fork a process holding PyMOL state
+        self.jobs = queue.Queue()
+        self.threads = [threading.Thread(target=self._dispatch, daemon=True) for _ in range(self.n_workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _start_worker(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _stop_worker(self, process, conn, kill=False):
+        if kill:
+            process.kill()
+        else:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        process.join(timeout=5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+
+    def _dispatch(self):
+        """
+        Owns one worker process; restarts it after a timeout or crash.
+        """
+        process = conn = None
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, message, timeout = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if process is None or not process.is_alive():
+                process, conn = self._start_worker()
+            try:
+                conn.send(message)
+                if not conn.poll(timeout):
+                    self._stop_worker(process, conn, kill=True)
+                    process = conn = None
+                    future.set_exception(TimeoutError(f"Mutation job exceeded {timeout:.0f} s"))
+                    continue
+                status, payload = conn.recv()
+            except (EOFError, BrokenPipeError, OSError) as e:
+                self._stop_worker(process, conn, kill=True)
+                process = conn = None
+                future.set_exception(RuntimeError(f"Mutation worker died: {e}"))
+                continue
+            if status == 'ok':
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"Error in PyMOL mutation: {payload}"))
+        if process is not None:
+            self._stop_worker(process, conn)
+
+    def submit(self, pdb_path, variants, out_dir, timeout=None):
+        """
+        Queues one job. Returns a Future resolving to the list of output PDB paths
+        (one per variant, in order, written under `out_dir`).
+        """
+        future = Future()
+        self.jobs.put((future, (pdb_path, list(variants), out_dir), timeout or self.timeout))
+        return future
+
+    def map_variants(self, pdb_path, variants, out_dir, chunk_size=10, timeout=None):
+        """
+        Splits `variants` into jobs of `chunk_size` spread over the workers and yields
+        (variant, output path) in input order as jobs complete.
+        """
+        chunks = [variants[i:i + chunk_size] for i in range(0, len(variants), chunk_size)]
+        futures = [self.submit(pdb_path, chunk, out_dir, timeout) for chunk in chunks]
+        try:
+            for chunk, future in zip(chunks, futures):
+                yield from zip(chunk, future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
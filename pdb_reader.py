@@ -0,0 +1,192 @@
+"""
+Fixed-column PDB reader shared by averageSASA, mutate and Ensemble_analysis
+(which adds the repository root to sys.path to import it).
+
+The file is memory-mapped (or a bytes buffer is wrapped) and viewed as one uint8
+array. Line boundaries come from a single newline search, and each field is
+sliced for all selected lines at once with a gather, so no per-line Python work is
+done. Columns follow the wwPDB ATOM/HETATM layout:
+
+    record 1-6, serial 7-11, name 13-16, altLoc 17, resName 18-20, chainID 22,
+    resSeq 23-26, iCode 27, x/y/z 31-54, occupancy 55-60, tempFactor 61-66
+"""
+import mmap
+import os
+
+import numpy as np
+
+# 0-based [start, stop) column ranges
+RECORD = (0, 6)
+SERIAL = (6, 11)
+NAME = (12, 16)
+ALTLOC = (16, 17)
+RESNAME = (17, 20)
+CHAIN = (21, 22)
+RESSEQ = (22, 26)
+ICODE = (26, 27)
+X = (30, 38)
+Y = (38, 46)
+Z = (46, 54)
+OCCUPANCY = (54, 60)
+BFACTOR = (60, 66)
+
+ATOM_RECORDS = (b'ATOM', b'HETATM')
+
+def _numbers(raw, dtype):
+    """
+    Converts a fixed-width bytes array to numbers; blank or malformed fields become NaN (or -1 for ints).
+    """
+    raw = np.char.strip(raw)
+    try:
+        if np.issubdtype(dtype, np.integer):
+            blank = raw == b''
+            raw[blank] = b'-1'
+            return raw.astype(dtype)
+        raw[raw == b''] = b'nan'
+        return raw.astype(dtype)
+    except ValueError:
+        out = np.empty(len(raw), dtype=np.float64)
+        for i, value in enumerate(raw.tolist()):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                out[i] = np.nan
+        if np.issubdtype(dtype, np.integer):
+            return np.where(np.isnan(out), -1, out).astype(dtype)
+        return out.astype(dtype)
+
+class PDBText:
+    """
+    PDB file or buffer viewed as a uint8 array with per-line offsets.
+    `source` is a path (str or PathLike, memory-mapped read-only) or bytes content.
+    """
+    def __init__(self, source):
+        self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    data = b''
+                else:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    data = self._mmap
+        else:
+            data = source
+        self.buffer = np.frombuffer(data, dtype=np.uint8) if len(data) else np.empty(0, dtype=np.uint8)
+
+        newlines = np.flatnonzero(self.buffer == ord('\n'))
+        self.starts = np.concatenate(([0], newlines + 1))
+        self.ends = np.concatenate((newlines, [len(self.buffer)]))
+        if len(self.starts) and self.starts[-1] == len(self.buffer):
+            # No line after a trailing newline
+            self.starts, self.ends = self.starts[:-1], self.ends[:-1]
+        # Windows line endings: drop the '\r' from the line body
+        if len(self.ends):
+            has_cr = self.buffer[np.maximum(self.ends - 1, 0)] == ord('\r')
+            self.ends = np.where(has_cr & (self.ends > self.starts), self.ends - 1, self.ends)
+
+    @property
+    def n_lines(self):
+        return len(self.starts)
+
+    def field(self, start, stop, lines=None):
+        """
+        Raw bytes of columns [start, stop) for `lines` (all lines when None) as an
+        S(stop-start) array; columns past the end of a line read as spaces.
+        """
+        starts = self.starts if lines is None else self.starts[lines]
+        ends = self.ends if lines is None else self.ends[lines]
+        width = stop - start
+        if len(starts) == 0 or len(self.buffer) == 0:
+            return np.zeros(len(starts), dtype=f'S{width}')
+        index = starts[:, None] + np.arange(start, stop)
+        inside = index < ends[:, None]
+        chars = self.buffer[np.where(inside, index, 0)]
+        chars = np.where(inside, chars, ord(' ')).astype(np.uint8)
+        return np.ascontiguousarray(chars).view(f'S{width}').ravel()
+
+    def numbers(self, start, stop, lines=None, dtype=np.float64):
+        """
+        Columns [start, stop) parsed as numbers (NaN, or -1 for integers, where blank).
+        """
+        return _numbers(self.field(start, stop, lines), dtype)
+
+    def record_names(self, lines=None):
+        """
+        Record name of each line (columns 1-6, trailing spaces stripped).
+        """
+        return np.char.rstrip(self.field(*RECORD, lines))
+
+    def find(self, records, lines=None):
+        """
+        Indices of lines whose record name is one of `records` (bytes).
+        """
+        names = self.record_names(lines)
+        mask = np.isin(names, [r.rstrip() for r in records])
+        found = np.flatnonzero(mask)
+        return found if lines is None else np.asarray(lines)[found]
+
+    def line(self, i):
+        """
+        One line as bytes (without the line terminator).
+        """
+        return self.buffer[self.starts[i]:self.ends[i]].tobytes()
+
+    def atoms(self, lines=None):
+        """
+        Columnar ATOM/HETATM table. With `lines` None every atom record of the file is
+        read (all models). Text fields are stripped bytes arrays; xyz is float64 (n, 3).
+        """
+        if lines is None:
+            lines = self.find(ATOM_RECORDS)
+        return {
+            'line': lines,
+            'record': np.char.rstrip(self.field(*RECORD, lines)),
+            'serial': self.numbers(*SERIAL, lines, np.int64),
+            'name': np.char.strip(self.field(*NAME, lines)),
+            'altloc': np.char.strip(self.field(*ALTLOC, lines)),
+            'resname': np.char.strip(self.field(*RESNAME, lines)),
+            'chain': self.field(*CHAIN, lines),
+            'resseq': self.numbers(*RESSEQ, lines, np.int64),
+            'icode': np.char.strip(self.field(*ICODE, lines)),
+            'xyz': np.stack([self.numbers(*c, lines) for c in (X, Y, Z)], axis=1),
+            'occupancy': self.numbers(*OCCUPANCY, lines),
+            'bfactor': self.numbers(*BFACTOR, lines),
+        }
+
+    def close(self):
+        self.buffer = np.empty(0, dtype=np.uint8)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_atoms(source):
+    """
+    Columnar table of every ATOM/HETATM record of a PDB path or bytes content.
+    """
+    with PDBText(source) as pdb:
+        return pdb.atoms()
+
+def read_header(path, stop_records=(b'MODEL', b'ATOM', b'HETATM')):
+    """
+    PDBText over the lines before the first of `stop_records` (e.g. the REMARK block
+    of an ensemble). Only the header bytes are copied out of the memory map, so the
+    cost does not depend on the size of the coordinate section.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return PDBText(b'')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = len(data)
+            for record in stop_records:
+                if data[:len(record)] == record:
+                    return PDBText(b'')
+                pos = data.find(b'\n' + record)
+                if pos != -1:
+                    end = min(end, pos + 1)
+            return PDBText(data[:end])
@@ -0,0 +1,86 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from score_table import csv_hash
+
+# Window sizes used by the PCA/KDE pipeline
+N_PHI_PSI = 11  # (phi, psi) pairs per Phi_Psi_List
+N_PLDDT = 13    # values per pLDDT_List
+
+def cache_dir_for(csv_path):
+    """
+    Sidecar directory next to the CSV, e.g. updated_pocket.csv -> updated_pocket.csv.cache/
+    """
+    return csv_path + ".cache"
+
+def parse_number_lists(column, n_values):
+    """
+    Vectorized parse of a column of "(a; b); (c; d); ..." or "a; b; c" strings.
+    Returns a float32 (n_rows, n_values) array; rows with a different count or
+    missing values are NaN-padded/truncated.
+    """
+    text = column.fillna('').astype(str).str.replace(r'[()\s]', '', regex=True)
+    counts = np.where(text.str.len() > 0, text.str.count(';') + 1, 0).astype(np.int64)
+
+    out = np.full((len(text), n_values), np.nan, dtype=np.float32)
+    regular = counts == n_values
+    if regular.any():
+        # Fast path: one split over the joined column
+        joined = ';'.join(text[regular])
+        values = pd.to_numeric(pd.Series(joined.split(';')), errors='coerce').to_numpy(dtype=np.float32)
+        out[regular] = values.reshape(-1, n_values)
+
+    for i in np.flatnonzero(~regular & (counts > 0)):
+        values = pd.to_numeric(pd.Series(text.iat[i].split(';')), errors='coerce').to_numpy(dtype=np.float32)
+        out[i, :min(n_values, len(values))] = values[:n_values]
+    return out
+
+def build_cache(csv_path):
+    """
+    Parses the list columns once and writes them as .npy arrays next to the CSV:
+      phi_psi.npy  float32 (n_rows, 11, 2)
+      plddt.npy    float32 (n_rows, 13), only if the CSV has pLDDT_List
+      meta.json    source hash and row count
+    """
+    df = pd.read_csv(csv_path)
+    cache_dir = cache_dir_for(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    arrays = {}
+    if 'Phi_Psi_List' in df.columns:
+        arrays['phi_psi'] = parse_number_lists(df['Phi_Psi_List'], 2 * N_PHI_PSI).reshape(-1, N_PHI_PSI, 2)
+    if 'pLDDT_List' in df.columns:
+        arrays['plddt'] = parse_number_lists(df['pLDDT_List'], N_PLDDT)
+
+    for name, array in arrays.items():
+        tmp_path = os.path.join(cache_dir, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(cache_dir, f"{name}.npy"))
+
+    # Written last: a cache without a matching meta.json is treated as stale
+    with open(os.path.join(cache_dir, "meta.json"), 'w') as f:
+        json.dump({'source_hash': csv_hash(csv_path), 'n_rows': len(df), 'arrays': sorted(arrays)}, f)
+
+def load_phi_psi(csv_path):
+    """
+    Returns {'phi_psi': (n, 11, 2), 'plddt': (n, 13) or None} as read-only float32 memmaps.
+    The cache is rebuilt automatically when the CSV content changes.
+    """
+    cache_dir = cache_dir_for(csv_path)
+    meta_path = os.path.join(cache_dir, "meta.json")
+
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if meta is None or meta.get('source_hash') != csv_hash(csv_path):
+        build_cache(csv_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    result = {'phi_psi': None, 'plddt': None}
+    for name in meta['arrays']:
+        result[name] = np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r')
+    return result
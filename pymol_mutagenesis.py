@@ -0,0 +1,54 @@
+"""
+PyMOL mutagenesis, kept free of Streamlit so the mutation_pool worker processes
+can import it without loading the mutate.py page.
+"""
+from pymol import cmd
+
+def perform_mutation(pdb_path, mutations, output_path):
+    """
+    Uses PyMOL to mutate multiple residues to new residues and saves the result.
+    `mutations` is a list of tuples in the format (chain, res_num, new_res).
+    One structure per call; the reference mutate_batch is checked against.
+    """
+    try:
+        cmd.load(pdb_path, 'structure')
+        for mutation in mutations:
+            chain, res_num, new_res = mutation
+            selection = f'/structure//{chain}/{res_num}/'
+            cmd.wizard("mutagenesis")
+            cmd.refresh_wizard()
+            cmd.get_wizard().set_mode(new_res)
+            cmd.get_wizard().do_select(selection)
+            cmd.get_wizard().apply()
+        cmd.save(output_path)  # Save the final mutated file
+        cmd.delete('all')  # Clean up PyMOL session
+    except Exception as e:
+        raise RuntimeError(f"Error in PyMOL mutation: {e}")
+
+def mutate_batch(pdb_content, variants):
+    """
+    Applies each variant to the structure in one PyMOL session and yields
+    (variant, mutated PDB string) as they are produced, the same structures as
+    separate perform_mutation runs.
+    The upload is read once from the in-memory PDB string and every variant starts
+    from a copy of that object instead of a reload. The mutagenesis wizard is opened
+    fresh for each variant, so no wizard state carries over between variants.
+    """
+    cmd.read_pdbstr(pdb_content, 'original')
+    try:
+        for variant in variants:
+            cmd.create('variant', 'original')
+            cmd.wizard("mutagenesis")
+            cmd.refresh_wizard()
+            wizard = cmd.get_wizard()
+            for chain, res_num, new_res in variant:
+                wizard.set_mode(new_res)
+                wizard.do_select(f'/variant//{chain}/{res_num}/')
+                wizard.apply()
+            cmd.set_wizard()
+            yield variant, cmd.get_pdbstr('variant')
+            cmd.delete('variant')
+    finally:
+        cmd.set_wizard()
+        cmd.delete('original')
+        cmd.delete('variant')
@@ -0,0 +1,104 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from sequence_scoring import CENTER, WINDOW_LENGTH
+
+def normalize_pattern(input_sequence):
+    """
+    Canonical cache key for a partial query: a 13-tuple of upper-case residues
+    with '' for unconstrained positions. The central N is always filled.
+    """
+    pattern = []
+    for i in range(WINDOW_LENGTH):
+        char = input_sequence[i] if i < len(input_sequence) else ''
+        char = (char or '').strip().upper()
+        pattern.append(char)
+    pattern[CENTER] = 'N'
+    return tuple(pattern)
+
+def _entry_size(value):
+    """
+    Approximate bytes held by a cached value: array buffers plus container overhead.
+    """
+    if isinstance(value, np.ndarray):
+        # getsizeof already includes the buffer for arrays that own their data
+        return sys.getsizeof(value) + (0 if value.flags.owndata else value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_entry_size(k) + _entry_size(v) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_entry_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of per-query results (matching rows, KDE curve, score)
+    bounded by an approximate memory budget. Shared across Streamlit sessions via
+    st.cache_resource, so common patterns are computed once per dataset.
+    """
+    def __init__(self, max_bytes=256 * 1024 ** 2, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        size = _entry_size(key) + _entry_size(value)
+        with self.lock:
+            if size > self.max_bytes:
+                return  # larger than the whole budget; never cached
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.entries and (self.current_bytes > self.max_bytes or
+                                    (self.max_entries is not None and len(self.entries) > self.max_entries)):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached value for `key`, calling `compute()` and storing its result on a miss.
+        Concurrent misses on the same key may compute twice; the result is identical.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
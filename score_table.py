@@ -0,0 +1,193 @@
+"""
+Materialized scores for the most common sequon queries.
+
+Precomputes match count, KDE curve and score for every single-position constraint
+around the central N (12 positions x 20 residues) and the most frequent
+two-position combinations, and stores them in one compressed .npz next to the
+dataset. app.py loads it at startup and answers those queries by dictionary lookup.
+
+Example:
+    python score_table.py filtered_data_surrounding_sequence_pca1.csv --pairs 2000
+"""
+import argparse
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from sequence_scoring import (BW_ADJUST, CENTER, DEFAULT_DATA, GRIDSIZE, POCKET_MEAN, SIGMA, WINDOW_LENGTH,
+                              SequenceIndex, closed_form_score, kde_fft)
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+def csv_hash(csv_path):
+    """
+    SHA-256 of the CSV content, stored with the table to detect edits.
+    """
+    h = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def pattern_key(pattern):
+    """
+    Compact string form of a 13-residue partial query, '.' for unconstrained positions.
+    """
+    return ''.join(char or '.' for char in pattern)
+
+def score_table_path(data_path):
+    return data_path + ".scores.npz"
+
+def single_patterns():
+    """
+    Every one-position constraint next to the N: 12 positions x 20 residues.
+    """
+    patterns = []
+    for pos in range(WINDOW_LENGTH):
+        if pos == CENTER:
+            continue
+        for residue in AMINO_ACIDS:
+            pattern = [''] * WINDOW_LENGTH
+            pattern[CENTER] = 'N'
+            pattern[pos] = residue
+            patterns.append(tuple(pattern))
+    return patterns
+
+def frequent_pair_patterns(index, n_pairs):
+    """
+    The `n_pairs` two-position constraints matching the most dataset rows,
+    counted with one bincount per position pair over the index's code matrix.
+    """
+    valid = np.zeros(256, dtype=bool)
+    valid[np.frombuffer(AMINO_ACIDS.encode(), dtype=np.uint8)] = True
+    positions = [p for p in range(min(index.length, WINDOW_LENGTH)) if p != CENTER]
+
+    candidates = []  # (count, pos_a, code_a, pos_b, code_b)
+    for i, pos_a in enumerate(positions):
+        for pos_b in positions[i + 1:]:
+            a = index.codes[:, pos_a].astype(np.int64)
+            b = index.codes[:, pos_b].astype(np.int64)
+            counts = np.bincount(a * 256 + b, minlength=256 * 256)
+            combos = np.flatnonzero(counts)
+            combos = combos[valid[combos // 256] & valid[combos % 256]]
+            candidates.extend(zip(counts[combos].tolist(), [pos_a] * len(combos), (combos // 256).tolist(),
+                                  [pos_b] * len(combos), (combos % 256).tolist()))
+
+    candidates.sort(key=lambda c: -c[0])
+    patterns = []
+    for _, pos_a, code_a, pos_b, code_b in candidates[:n_pairs]:
+        pattern = [''] * WINDOW_LENGTH
+        pattern[CENTER] = 'N'
+        pattern[pos_a] = chr(code_a)
+        pattern[pos_b] = chr(code_b)
+        patterns.append(tuple(pattern))
+    return patterns
+
+def build_score_table(data_path=DEFAULT_DATA, output_path=None, n_pairs=2000, pocket_mean=POCKET_MEAN,
+                      sigma=SIGMA, bw_adjust=BW_ADJUST, gridsize=GRIDSIZE):
+    """
+    Scores the single-position and frequent pair patterns of `data_path` and writes them to
+    `output_path` (default <data>.scores.npz):
+      keys     pattern strings ('.' = wildcard)
+      n_match  matching rows per pattern
+      score    closed-form score at (pocket_mean, sigma)
+      x_range  (lo, hi) of each KDE grid; the grid is linspace(lo, hi, gridsize)
+      kde      float32 (n_patterns, gridsize) densities, zeros where the KDE is undefined
+      meta     JSON with the source hash, row count and scoring parameters
+    Returns the number of patterns written.
+    """
+    data = pd.read_csv(data_path, usecols=['Surrounding_sequence', 'PCA1'])
+    index = SequenceIndex(data['Surrounding_sequence'], data['PCA1'])
+    patterns = single_patterns() + frequent_pair_patterns(index, n_pairs)
+
+    n = len(patterns)
+    n_match = np.zeros(n, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.float64)
+    x_range = np.full((n, 2), np.nan, dtype=np.float64)
+    kde = np.zeros((n, gridsize), dtype=np.float32)
+    for i, pattern in enumerate(patterns):
+        pca1 = index.match_pca1(pattern)
+        n_match[i] = len(pca1)
+        scores[i] = closed_form_score(pca1, pocket_mean, sigma, bw_adjust)
+        x_values, density = kde_fft(pca1, bw_adjust=bw_adjust, gridsize=gridsize)
+        if len(x_values):
+            x_range[i] = x_values[0], x_values[-1]
+            kde[i] = density
+
+    meta = {
+        'source_hash': csv_hash(data_path),
+        'n_rows': index.n_rows,
+        'pocket_mean': pocket_mean,
+        'sigma': sigma,
+        'bw_adjust': bw_adjust,
+        'gridsize': gridsize,
+    }
+    if output_path is None:
+        output_path = score_table_path(data_path)
+    with open(output_path, 'wb') as f:
+        np.savez_compressed(f, keys=np.array([pattern_key(p) for p in patterns]), n_match=n_match,
+                            score=scores, x_range=x_range, kde=kde, meta=np.array(json.dumps(meta)))
+    return n
+
+class ScoreTable:
+    """
+    In-memory view of a score table artifact with constant-time lookup by pattern.
+    """
+    def __init__(self, path):
+        with np.load(path) as archive:
+            self.meta = json.loads(str(archive['meta']))
+            self.n_match = archive['n_match']
+            self.score = archive['score']
+            self.x_range = archive['x_range']
+            self.kde = archive['kde']
+            self.rows = {key: i for i, key in enumerate(archive['keys'].tolist())}
+
+    def matches(self, n_rows, pocket_mean, sigma, bw_adjust=BW_ADJUST):
+        """
+        Whether the table was built for a dataset of this size and these scoring parameters.
+        """
+        return (self.meta['n_rows'] == n_rows and self.meta['pocket_mean'] == pocket_mean
+                and self.meta['sigma'] == sigma and self.meta['bw_adjust'] == bw_adjust)
+
+    def lookup(self, pattern):
+        """
+        (n_match, x_values, kde_values, score) for a precomputed pattern, else None.
+        """
+        i = self.rows.get(pattern_key(pattern))
+        if i is None:
+            return None
+        if np.isnan(self.x_range[i, 0]):
+            x_values, kde_values = np.empty(0), np.empty(0)
+        else:
+            x_values = np.linspace(self.x_range[i, 0], self.x_range[i, 1], self.meta['gridsize'])
+            kde_values = self.kde[i].astype(np.float64)
+        return int(self.n_match[i]), x_values, kde_values, float(self.score[i])
+
+def load_score_table(data_path):
+    """
+    ScoreTable for `data_path`, or None if there is none or the dataset changed since it was built.
+    """
+    try:
+        table = ScoreTable(score_table_path(data_path))
+    except (OSError, KeyError, ValueError):
+        return None
+    if table.meta.get('source_hash') != csv_hash(data_path):
+        return None
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute scores for common sequon queries.")
+    parser.add_argument('data', nargs='?', default=DEFAULT_DATA, help="Surrounding_sequence/PCA1 CSV")
+    parser.add_argument('-o', '--output', default=None, help="Output .npz (default: <data>.scores.npz)")
+    parser.add_argument('--pairs', type=int, default=2000, help="Most frequent two-position patterns to include")
+    parser.add_argument('--pocket-mean', type=float, default=POCKET_MEAN)
+    parser.add_argument('--sigma', type=float, default=SIGMA)
+    args = parser.parse_args()
+
+    n = build_score_table(args.data, args.output, n_pairs=args.pairs, pocket_mean=args.pocket_mean, sigma=args.sigma)
+    print(f"Wrote {n} patterns -> {args.output or score_table_path(args.data)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import numpy as np
+
+# Sequon windows are 13 residues with the glycosylated 'N' at index 5
+WINDOW_LENGTH = 13
+CENTER = 5
+
+# Scoring setup shared by app.py, score_table.py, sequon_scanner.py and benchmarks.py
+DEFAULT_DATA = 'filtered_data_surrounding_sequence_pca1.csv'
+POCKET_MEAN = 2.30  # PCA1 of the OST pocket
+SIGMA = 0.1         # width of the Gaussian weighting around the pocket
+BW_ADJUST = 0.5     # KDE bandwidth adjustment (seaborn's bw_adjust)
+GRIDSIZE = 400      # points of the KDE curves shown by the app and stored in score tables
+
+class SequenceIndex:
+    """
+    Positional inverted index over `Surrounding_sequence` windows.
+    For every (position, residue) pair it keeps the sorted row ids of the sequences
+    carrying that residue there, so a partial query is an intersection of at most
+    one posting list per filled position instead of a scan over the dataset.
+    """
+    def __init__(self, sequences, pca1=None):
+        sequences = [str(s) for s in sequences]
+        self.n_rows = len(sequences)
+        self.length = max((len(s) for s in sequences), default=WINDOW_LENGTH)
+        self.pca1 = None if pca1 is None else np.asarray(pca1, dtype=np.float64)
+
+        # (n_rows, length) byte matrix; shorter sequences are padded with NUL
+        padded = ''.join(s.ljust(self.length, '\0') for s in sequences)
+        codes = np.frombuffer(padded.encode('latin-1', errors='replace'), dtype=np.uint8)
+        self.codes = codes.reshape(self.n_rows, self.length)
+
+        # Per position: rows sorted by residue code (stable, so row ids stay ascending
+        # within a residue) and the slice bounds of each residue's posting list
+        self.order = []
+        self.bounds = []
+        for pos in range(self.length):
+            column = self.codes[:, pos]
+            order = np.argsort(column, kind='stable')
+            sorted_codes = column[order]
+            residues, starts = np.unique(sorted_codes, return_index=True)
+            ends = np.append(starts[1:], len(sorted_codes))
+            self.order.append(order)
+            self.bounds.append({int(r): (int(s), int(e)) for r, s, e in zip(residues, starts, ends)})
+
+    def postings(self, pos, char):
+        """
+        Sorted row ids whose sequence has `char` at `pos` (empty if none).
+        """
+        if pos >= self.length or len(char) != 1:
+            return np.empty(0, dtype=np.intp)
+        code = char.encode('latin-1', errors='replace')[0]
+        start, end = self.bounds[pos].get(code, (0, 0))
+        return self.order[pos][start:end]
+
+    def match_rows(self, input_sequence):
+        """
+        Row ids (ascending) of sequences matching every non-empty character of
+        `input_sequence`, the same rows partial_sequence_match selects.
+        """
+        lists = [self.postings(i, char) for i, char in enumerate(input_sequence) if char]
+        if not lists:
+            return np.arange(self.n_rows)
+
+        # Intersect from the shortest list so each step is a binary search into a longer one
+        lists.sort(key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            if len(rows) == 0:
+                break
+            pos = np.searchsorted(other, rows)
+            pos[pos == len(other)] = 0
+            rows = rows[other[pos] == rows] if len(other) else rows[:0]
+        return rows
+
+    def match_pca1(self, input_sequence):
+        """
+        PCA1 values of the matching rows, in dataset order.
+        """
+        return self.pca1[self.match_rows(input_sequence)]
+
+def partial_sequence_match(input_sequence, sequences):
+    """
+    Reference linear scan: sequences matching every non-empty character of `input_sequence`.
+    SequenceIndex.match_rows returns the same rows without scanning.
+    """
+    matches = []
+    for seq in sequences:
+        is_match = True
+        for i, char in enumerate(input_sequence):
+            if char and seq[i] != char:  # If a character is provided and doesn't match
+                is_match = False
+                break
+        if is_match:
+            matches.append(seq)
+    return matches
+
+def kde_bandwidth(data, bw_adjust=1.0):
+    """
+    Gaussian kernel standard deviation used by seaborn.kdeplot:
+    Scott's factor n**(-1/5) times bw_adjust, scaled by the sample std (ddof=1).
+    Returns 0.0 when a KDE is undefined (fewer than 2 points or zero variance).
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.size < 2:
+        return 0.0
+    std = data.std(ddof=1)
+    if not np.isfinite(std) or std == 0:
+        return 0.0
+    return data.size ** (-1.0 / 5.0) * bw_adjust * std
+
+def kde_support(data, bw, cut=3, gridsize=200):
+    """
+    seaborn's evaluation grid: from min - cut*bw to max + cut*bw.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    return np.linspace(data.min() - bw * cut, data.max() + bw * cut, gridsize)
+
+def kde_fft(data, bw_adjust=0.5, grid=None, cut=3, gridsize=200, bins_per_bw=40, max_bins=1 << 18):
+    """
+    Gaussian KDE evaluated on `grid` (seaborn's grid when None) by linear binning onto
+    a fine uniform mesh and one FFT convolution with the kernel: O(n + bins) instead
+    of O(n * grid). Matches seaborn.kdeplot(data, bw_adjust=...) to ~1e-4 relative.
+    Returns (x_values, density); both empty if the KDE is undefined.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    data = data[np.isfinite(data)]
+    bw = kde_bandwidth(data, bw_adjust)
+    if bw == 0.0:
+        return np.empty(0), np.empty(0)
+    if grid is None:
+        grid = kde_support(data, bw, cut, gridsize)
+    grid = np.asarray(grid, dtype=np.float64)
+    if grid.size == 0:
+        return grid, np.empty(0)
+
+    # Fine mesh covering the data plus the kernel tails (the grid beyond it has ~0 density)
+    lo = min(data.min(), grid.min()) - 4 * bw
+    hi = max(data.max(), grid.max()) + 4 * bw
+    n_bins = int(min(max_bins, max(256, np.ceil((hi - lo) / bw * bins_per_bw) + 1)))
+    delta = (hi - lo) / (n_bins - 1)
+
+    # Linear binning: each point splits its unit weight between its two mesh neighbours
+    pos = (data - lo) / delta
+    left = np.floor(pos).astype(np.int64)
+    frac = pos - left
+    counts = np.bincount(left, weights=1.0 - frac, minlength=n_bins + 1)
+    counts += np.bincount(left + 1, weights=frac, minlength=n_bins + 1)
+    counts = counts[:n_bins]
+
+    # Kernel sampled on the mesh offsets, truncated where it is numerically zero
+    half = int(min(n_bins - 1, np.ceil(8 * bw / delta)))
+    offsets = np.arange(-half, half + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2) / (bw * np.sqrt(2 * np.pi) * data.size)
+
+    size = 1 << int(np.ceil(np.log2(n_bins + 2 * half + 1)))
+    conv = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    mesh_density = np.maximum(conv[half:half + n_bins], 0.0)
+
+    mesh = lo + delta * np.arange(n_bins)
+    return grid, np.interp(grid, mesh, mesh_density, left=0.0, right=0.0)
+
+# Gaussian kernel function
+def gaussian_kernel(u, sigma):
+    return (1 / (sigma * np.sqrt(2 * np.pi))) * np.exp(- (u ** 2) / (2 * sigma ** 2))
+
+# np.trapz was removed in NumPy 2.x in favour of np.trapezoid
+_trapezoid = getattr(np, 'trapezoid', None) or getattr(np, 'trapz')
+
+# Scoring function using KDE and Gaussian kernel weighting
+def compute_score(f_x, x_values, x0, sigma):
+    """
+    Calculate a weighted score based on the proximity of KDE distribution to a reference point (x0).
+    Grid-based: the result depends on the resolution and range of x_values.
+    
+    Parameters:
+    - f_x: KDE density values at points x_values
+    - x_values: x-axis values corresponding to f_x
+    - x0: Reference point (pocket mean)
+    - sigma: Bandwidth parameter for the Gaussian kernel
+    
+    Returns:
+    - score: Higher score indicates closer alignment with pocket mean
+    """
+    # Calculate Gaussian kernel weights centered on x0
+    K = gaussian_kernel(x_values - x0, sigma)
+    
+    # Compute the weighted score as the integral of the product f_x * K
+    weighted_score = _trapezoid(f_x * K, x_values)
+    return weighted_score
+
+def closed_form_score(data, x0, sigma, bw_adjust=0.5):
+    """
+    Grid-free version of compute_score(KDE(data), x, x0, sigma).
+    A Gaussian KDE with bandwidth h convolved with a Gaussian of width sigma is a
+    Gaussian mixture, so the integral is exactly
+        mean_i N(x_i - x0; 0, h^2 + sigma^2)
+    `x0` and `sigma` broadcast against each other, so many (pocket_mean, sigma)
+    pairs are scored in one reduction. Returns 0 where the KDE is undefined.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    data = data[np.isfinite(data)]
+    x0, sigma = np.broadcast_arrays(np.asarray(x0, dtype=np.float64), np.asarray(sigma, dtype=np.float64))
+
+    h = kde_bandwidth(data, bw_adjust)
+    if h == 0.0:
+        scores = np.zeros(x0.shape)
+    else:
+        scale = np.sqrt(h ** 2 + sigma ** 2)[..., None]
+        scores = gaussian_kernel(data - x0[..., None], scale).mean(axis=-1)
+    return float(scores) if scores.ndim == 0 else scores
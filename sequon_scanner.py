@@ -0,0 +1,233 @@
+"""
+Headless N-glycosylation sequon scanner.
+
+Streams a FASTA file, extracts every N-X-S/T window in the 13-residue
+`Surrounding_sequence` layout used by app.py (the 'N' at index 5), and scores
+each window against the PCA1 dataset with the same partial-match + Gaussian
+kernel score. Results are written as they are produced; a ranked top-k file is
+written at the end.
+
+Example:
+    python sequon_scanner.py proteome.fasta -o sequons.tsv --workers 4
+"""
+import argparse
+import csv
+import heapq
+import re
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from sequence_scoring import (BW_ADJUST, CENTER, DEFAULT_DATA, POCKET_MEAN, SIGMA, WINDOW_LENGTH, SequenceIndex,
+                              closed_form_score)
+
+# Offsets (relative to the N) constrained when matching a window; the rest are wildcards
+DEFAULT_OFFSETS = (-1, 1, 2, 3)
+
+# N-X-S/T with X != P; lookahead so overlapping sequons are all found
+SEQUON = re.compile(r'(?=N[^P][ST])')
+SEQUON_WITH_PROLINE = re.compile(r'(?=N.[ST])')
+
+def read_fasta(handle):
+    """
+    Yields (record_id, sequence) one record at a time.
+    """
+    record_id, chunks = None, []
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('>'):
+            if record_id is not None:
+                yield record_id, ''.join(chunks).upper()
+            record_id, chunks = line[1:].split()[0] if len(line) > 1 else '', []
+        else:
+            chunks.append(line)
+    if record_id is not None:
+        yield record_id, ''.join(chunks).upper()
+
+def extract_windows(sequence, allow_proline=False):
+    """
+    All sequon windows of a protein as (position, window) with 1-based N positions.
+    Windows near the termini are padded with '-' so the N stays at index 5.
+    """
+    pattern = SEQUON_WITH_PROLINE if allow_proline else SEQUON
+    padded = '-' * CENTER + sequence + '-' * (WINDOW_LENGTH - CENTER - 1)
+    return [(m.start() + 1, padded[m.start():m.start() + WINDOW_LENGTH]) for m in pattern.finditer(sequence)]
+
+def window_query(window, offsets=DEFAULT_OFFSETS):
+    """
+    Partial query for SequenceIndex: the N plus the residues at `offsets`, others empty.
+    Padding ('-') is left unconstrained.
+    """
+    query = [''] * WINDOW_LENGTH
+    query[CENTER] = 'N'
+    for offset in offsets:
+        char = window[CENTER + offset]
+        if char != '-':
+            query[CENTER + offset] = char
+    return tuple(query)
+
+class WindowScorer:
+    """
+    Scores windows in batches. Identical partial queries are scored once and
+    memoized, which is most of the work on a proteome (few distinct patterns).
+    """
+    def __init__(self, index, offsets=DEFAULT_OFFSETS, pocket_mean=POCKET_MEAN, sigma=SIGMA,
+                 bw_adjust=BW_ADJUST, max_cached=100000):
+        self.index = index
+        self.offsets = offsets
+        self.pocket_mean = pocket_mean
+        self.sigma = sigma
+        self.bw_adjust = bw_adjust
+        self.max_cached = max_cached
+        self.cache = {}
+
+    def score_batch(self, windows):
+        """
+        Returns (n_matches, scores) arrays for a list of windows.
+        """
+        queries = [window_query(w, self.offsets) for w in windows]
+        for query in dict.fromkeys(queries):
+            if query not in self.cache:
+                if len(self.cache) >= self.max_cached:
+                    self.cache.clear()
+                rows = self.index.match_rows(query)
+                score = closed_form_score(self.index.pca1[rows], self.pocket_mean, self.sigma, self.bw_adjust)
+                self.cache[query] = (len(rows), score)
+        results = [self.cache[q] for q in queries]
+        return (np.array([r[0] for r in results], dtype=np.int64),
+                np.array([r[1] for r in results], dtype=np.float64))
+
+def load_index(data_path):
+    data = pd.read_csv(data_path, usecols=['Surrounding_sequence', 'PCA1'])
+    return SequenceIndex(data['Surrounding_sequence'], data['PCA1'])
+
+# Worker-side state for sharded scanning
+_scorer = None
+_allow_proline = False
+
+def _init_worker(data_path, offsets, allow_proline):
+    global _scorer, _allow_proline
+    _scorer = WindowScorer(load_index(data_path), offsets=offsets)
+    _allow_proline = allow_proline
+
+def _scan_records(records, scorer=None, allow_proline=None):
+    """
+    Extracts and scores all windows of a batch of FASTA records.
+    Returns rows of (record_id, position, window, n_matches, score).
+    """
+    scorer = scorer or _scorer
+    allow_proline = _allow_proline if allow_proline is None else allow_proline
+
+    ids, positions, windows = [], [], []
+    for record_id, sequence in records:
+        for position, window in extract_windows(sequence, allow_proline):
+            ids.append(record_id)
+            positions.append(position)
+            windows.append(window)
+    if not windows:
+        return []
+    n_matches, scores = scorer.score_batch(windows)
+    return list(zip(ids, positions, windows, n_matches.tolist(), scores.tolist()))
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _imap_bounded(pool, func, iterable, max_pending):
+    """
+    Ordered pool.imap that keeps at most `max_pending` tasks in flight.
+    Pool.imap drains the input eagerly, which would read the whole FASTA into the task queue.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def scan(fasta_path, output_path, data_path=DEFAULT_DATA, offsets=DEFAULT_OFFSETS, workers=1,
+         batch_size=200, top=1000, ranked_path=None, allow_proline=False):
+    """
+    Streams `fasta_path` through the scorer, appending every window to `output_path`
+    (TSV) as batches finish. Memory is bounded by one batch per worker plus a top-k heap.
+    The `top` best windows are written, ranked by score, to `ranked_path`.
+    Returns the number of windows scored.
+    """
+    header = ['protein', 'position', 'window', 'n_matches', 'score']
+    best = []  # min-heap of (score, counter, row)
+    n_windows = 0
+
+    with open(fasta_path) as fasta, open(output_path, 'w', newline='') as out:
+        writer = csv.writer(out, delimiter='\t')
+        writer.writerow(header)
+        batches = _batched(read_fasta(fasta), batch_size)
+
+        if workers > 1:
+            pool = Pool(workers, initializer=_init_worker, initargs=(data_path, offsets, allow_proline))
+            results = _imap_bounded(pool, _scan_records, batches, max_pending=2 * workers)
+        else:
+            pool = None
+            scorer = WindowScorer(load_index(data_path), offsets=offsets)
+            results = (_scan_records(batch, scorer, allow_proline) for batch in batches)
+
+        try:
+            for rows in results:
+                writer.writerows(rows)
+                out.flush()
+                for row in rows:
+                    entry = (row[4], n_windows, row)
+                    if len(best) < top:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                    n_windows += 1
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    if ranked_path is None:
+        ranked_path = re.sub(r'(\.\w+)?$', r'.ranked\1', output_path, count=1)
+    with open(ranked_path, 'w', newline='') as out:
+        writer = csv.writer(out, delimiter='\t')
+        writer.writerow(['rank'] + header)
+        for rank, (_, _, row) in enumerate(sorted(best, reverse=True), start=1):
+            writer.writerow([rank, *row])
+
+    return n_windows
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a FASTA proteome for N-X-S/T sequons and score them.")
+    parser.add_argument('fasta', help="Input FASTA file")
+    parser.add_argument('-o', '--output', default='sequons.tsv', help="Output TSV with every window")
+    parser.add_argument('--ranked', default=None, help="Ranked top-k TSV (default: <output>.ranked.tsv)")
+    parser.add_argument('--data', default=DEFAULT_DATA, help="Surrounding_sequence/PCA1 CSV")
+    parser.add_argument('--offsets', default=','.join(map(str, DEFAULT_OFFSETS)),
+                        help="Comma-separated offsets from the N to match on (e.g. -1,1,2,3)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+    parser.add_argument('--batch-size', type=int, default=200, help="FASTA records per batch")
+    parser.add_argument('--top', type=int, default=1000, help="Windows kept in the ranked output")
+    parser.add_argument('--allow-proline', action='store_true', help="Also accept N-P-S/T")
+    args = parser.parse_args()
+
+    offsets = tuple(int(o) for o in args.offsets.split(',') if o.strip())
+    if any(o == 0 or not -CENTER <= o < WINDOW_LENGTH - CENTER for o in offsets):
+        parser.error(f"offsets must be non-zero and between {-CENTER} and {WINDOW_LENGTH - CENTER - 1}")
+    n = scan(args.fasta, args.output, data_path=args.data, offsets=offsets, workers=args.workers,
+             batch_size=args.batch_size, top=args.top, ranked_path=args.ranked,
+             allow_proline=args.allow_proline)
+    print(f"Scored {n} sequon windows -> {args.output}")
+
+if __name__ == "__main__":
+    main()
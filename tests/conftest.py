@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The apps are plain script directories, not installed packages
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "Ensemble_analysis")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+import averageSASA
+
+PDB = (
+    b"ATOM      1  N   ALA A   1      11.104   6.134  -6.504  1.00 12.50           N\n"
+    b"ATOM      2  CA  ALA A   1      11.639   6.071  -5.147  1.00  7.25           C\n"
+)
+
+def test_write_bfactors_replaces_only_the_column():
+    template = averageSASA.read_bfactor_table(PDB)
+    content = averageSASA.write_bfactors(template, np.array([-99.99, 999.99]))
+    assert content == PDB.decode().replace(" 12.50", "-99.99").replace("  7.25", "999.99")
+
+def test_write_bfactors_rejects_values_wider_than_the_field():
+    template = averageSASA.read_bfactor_table(PDB)
+    with pytest.raises(ValueError, match="1234.56 on line 2"):
+        averageSASA.write_bfactors(template, np.array([1.0, 1234.56]))
+    with pytest.raises(ValueError, match="-100.00"):
+        averageSASA.write_bfactors(template, np.array([-100.0, 1.0]))
@@ -0,0 +1,89 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+import batch_marking
+
+RUBRIC = {
+    'title': 'Test',
+    'sections': {'AIM': 0.5, 'RESULTS': 2.0},
+    'default_feedback': {'AIM': 'Aim is clearly defined.', 'RESULTS': 'Well presented.'},
+    'mark_format': '.1f',
+    'step': 0.1,
+    'max_tolerance': 0.0,
+}
+
+def _cohort():
+    return pd.DataFrame({
+        'Student': ['s1', 's2', 's3'],
+        'AIM': [0.5, 0.3, 0.0],
+        'AIM feedback': ['', 'Aim is vague.', None],
+        'RESULTS': [2.0, 1.5, 0.7],
+    })
+
+def test_feedback_table_layout():
+    table = batch_marking.create_feedback_table(
+        {'AIM': 0.5, 'RESULTS': 1.5}, {'AIM': 'ok', 'RESULTS': 'fine'}, RUBRIC['sections'])
+    lines = table.splitlines()
+    assert lines[0] == f"| {'Section'.ljust(9)} | {'Marks'.center(10)} | {'Feedback'.ljust(60)} |"
+    assert lines[1] == f"|{'-' * 9}|{'-' * 10}|{'-' * 60}|"
+    assert lines[2] == f"| {'AIM'.ljust(9)} | {'0.5/0.5'.center(10)} | {'ok'.ljust(60)} |"
+    assert lines[4] == f"| {'Total'.ljust(9)} | {'2.0/2.5'.center(10)} | {' ' * 60} |"
+    assert lines[5] == f"|{'=' * 84}|"
+
+def test_integer_marks_format_like_thermo():
+    # thermo.py's slider marks are ints and its maxima print as written (5, 1.5)
+    table = batch_marking.create_feedback_table(
+        {'Introduction': 3, 'Conclusion': 1}, {'Introduction': '', 'Conclusion': ''},
+        {'Introduction': 5, 'Conclusion': 1.5}, 'g')
+    assert '3/5' in table and '1/1.5' in table and '4/6.5' in table
+
+def test_bundled_rubrics_load():
+    rubrics = batch_marking.bundled_rubrics()
+    assert {'general_report.json', 'thermo.json', 'cool_drinking.json',
+            'double_salt.json', 'diaquaoxalatoiron.json'} <= set(rubrics)
+    for path in rubrics.values():
+        rubric = batch_marking.load_rubric(path)
+        assert set(rubric['default_feedback']) == set(rubric['sections'])
+
+def test_validate_cohort_reports_every_problem():
+    cohort = _cohort().astype({'AIM': object})
+    cohort.loc[0, 'AIM'] = 'abc'
+    cohort.loc[1, 'RESULTS'] = 2.5
+    cohort.loc[2, 'RESULTS'] = 0.75
+    cohort.loc[2, 'Student'] = 's1'
+    _, feedback, errors = batch_marking.validate_cohort(cohort, RUBRIC)
+    assert set(zip(errors['row'], errors['problem'])) == {
+        (2, 'not a number'), (3, 'above maximum'), (4, 'not a multiple of 0.1'),
+        (2, 'duplicate student ID'), (4, 'duplicate student ID'),
+    }
+    # Blank comments fall back to the rubric's default feedback
+    assert feedback[:, 0].tolist() == ['Aim is clearly defined.', 'Aim is vague.', 'Aim is clearly defined.']
+
+def test_missing_section_column():
+    with pytest.raises(ValueError, match='RESULTS'):
+        batch_marking.validate_cohort(_cohort().drop(columns='RESULTS'), RUBRIC)
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_feedback_zip(n_workers):
+    cohort = _cohort()
+    buffer = io.BytesIO()
+    errors = batch_marking.write_feedback_zip(cohort, RUBRIC, buffer, n_workers=n_workers)
+    assert errors.empty
+    with zipfile.ZipFile(buffer) as archive:
+        assert sorted(archive.namelist()) == ['s1.txt', 's2.txt', 's3.txt', 'summary.csv']
+        assert 'Aim is vague.' in archive.read('s2.txt').decode()
+        summary = pd.read_csv(io.BytesIO(archive.read('summary.csv')))
+    np.testing.assert_allclose(summary['Total'], [2.5, 1.8, 0.7])
+
+def test_read_cohort_spreadsheet(tmp_path):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "cohort.xlsx"
+    _cohort().to_excel(path, index=False)
+    cohort = batch_marking.read_cohort(str(path))
+    assert cohort['Student'].tolist() == ['s1', 's2', 's3']
+    assert batch_marking.validate_cohort(cohort, RUBRIC)[2].empty
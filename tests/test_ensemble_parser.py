@@ -0,0 +1,84 @@
+import os
+
+import mdtraj as md
+import numpy as np
+import pytest
+
+import ensemble_parser
+
+# Two-model ethanol-like ligand; the CONECT records follow the last ENDMDL
+ATOMS = [
+    ("C1", "C", (0.000, 0.000, 0.000)),
+    ("C2", "C", (1.520, 0.000, 0.000)),
+    ("O1", "O", (2.020, 1.350, 0.000)),
+    ("O2", "O", (-0.500, -1.350, 0.000)),
+]
+CONECT = [(1, 2), (2, 3), (1, 4)]
+
+def _write_ensemble(path, n_models=2, conect=True, remark="REMARK    Chain A Glycan: G00026MO\n"):
+    lines = [remark]
+    for model in range(n_models):
+        lines.append(f"MODEL     {model + 1:4d}\n")
+        for serial, (name, element, (x, y, z)) in enumerate(ATOMS, start=1):
+            lines.append(
+                f"HETATM{serial:5d} {name:<4s} LIG A   1    "
+                f"{x + 0.1 * model:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00          {element:>2s}\n"
+            )
+        lines.append("ENDMDL\n")
+    if conect:
+        for a, b in CONECT:
+            lines.append(f"CONECT{a:5d}{b:5d}\n")
+    lines.append("END\n")
+    with open(path, 'w') as f:
+        f.writelines(lines)
+    return path
+
+def _bond_pairs(topology):
+    return sorted(tuple(sorted((a.index, b.index))) for a, b in topology.bonds)
+
+def test_first_frame_keeps_trailing_conect(tmp_path):
+    pdb = _write_ensemble(str(tmp_path / "ensemble.pdb"))
+    expected = _bond_pairs(md.load(pdb).topology)
+    assert len(expected) == len(CONECT)
+    assert _bond_pairs(ensemble_parser.load_first_frame(pdb).topology) == expected
+
+def test_cached_ensemble_keeps_bonds_and_coordinates(tmp_path):
+    pdb = _write_ensemble(str(tmp_path / "ensemble.pdb"))
+    reference = md.load(pdb)
+
+    cache_dir = str(tmp_path / "cache")
+    cold, metadata = ensemble_parser.load_ensemble(pdb, cache_dir=cache_dir)
+    warm, _ = ensemble_parser.load_ensemble(pdb, cache_dir=cache_dir)
+    assert metadata == {'A': {'glycan_id': 'G00026MO'}}
+    for traj in (cold, warm):
+        assert _bond_pairs(traj.topology) == _bond_pairs(reference.topology)
+        np.testing.assert_allclose(traj.xyz, reference.xyz, atol=1e-6)
+
+def test_content_hash_is_stored_with_the_model_index(tmp_path, monkeypatch):
+    pdb = _write_ensemble(str(tmp_path / "ensemble.pdb"))
+    first = ensemble_parser.pdb_content_hash(pdb)
+
+    # A current sidecar answers without reading the PDB again
+    def fail(path):
+        raise AssertionError("PDB was re-read")
+    monkeypatch.setattr(ensemble_parser, "build_model_index", fail)
+    assert ensemble_parser.pdb_content_hash(pdb) == first
+    monkeypatch.undo()
+
+    _write_ensemble(pdb, n_models=3)
+    assert ensemble_parser.pdb_content_hash(pdb) != first
+
+def test_unconvertible_ensemble_falls_back_without_leaking_temp_dirs(tmp_path):
+    pdb = _write_ensemble(str(tmp_path / "ensemble.pdb"))
+    with open(pdb) as f:
+        lines = f.readlines()
+    # Drop one atom of the second model: the chunked reader raises ValueError
+    second_model = lines.index("MODEL        2\n")
+    del lines[second_model + 1]
+    with open(pdb, 'w') as f:
+        f.writelines(lines)
+
+    cache_dir = tmp_path / "cache"
+    with pytest.raises(ValueError):
+        ensemble_parser.write_ensemble_cache(pdb, cache_dir=str(cache_dir))
+    assert os.listdir(cache_dir) == []
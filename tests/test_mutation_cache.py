@@ -0,0 +1,28 @@
+import os
+
+import mutation_cache
+
+PDB = "ATOM      1  N   ALA A   1       0.000   0.000   0.000  1.00  0.00           N\n"
+
+def test_put_scans_only_over_budget(tmp_path, monkeypatch):
+    cache = mutation_cache.MutationCache(str(tmp_path), max_bytes=3 * len(PDB))
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, '_entries', lambda: scans.append(1) or entries())
+
+    for i in range(3):
+        cache.put('h', [('A', str(i), 'GLY')], PDB)
+        os.utime(cache.path('h', [('A', str(i), 'GLY')]), (i, i))
+    assert not scans and cache.current_bytes == 3 * len(PDB)
+
+    cache.put('h', [('A', '3', 'GLY')], PDB)
+    assert len(scans) == 1 and cache.current_bytes == 3 * len(PDB)
+    assert not cache.contains('h', [('A', '0', 'GLY')])  # least recently used
+    assert cache.contains('h', [('A', '3', 'GLY')])
+
+def test_total_seeded_from_directory_and_replacements(tmp_path):
+    cache = mutation_cache.MutationCache(str(tmp_path))
+    cache.put('h', [('A', '1', 'GLY')], PDB)
+    cache.put('h', [('A', '1', 'GLY')], PDB * 2)  # replacing an entry counts its new size only
+    assert cache.current_bytes == 2 * len(PDB)
+    assert mutation_cache.MutationCache(str(tmp_path)).current_bytes == 2 * len(PDB)
@@ -0,0 +1,28 @@
+import numpy as np
+
+import pdb_reader
+
+PDB = (
+    b"REMARK    Chain A Glycan: G00026MO\n"
+    b"MODEL        1\n"
+    b"ATOM      1  N   ALA A   1      11.104   6.134  -6.504  1.00 12.50           N\n"
+    b"ATOM      2  CA  ALA A   1      11.639   6.071  -5.147  1.00  7.25           C\n"
+    b"HETATM    3  C1  NAG B 101      -1.000   2.500   0.125  1.00\n"
+    b"ENDMDL\n"
+)
+
+def test_atoms_fixed_columns():
+    atoms = pdb_reader.read_atoms(PDB)
+    assert atoms['name'].tolist() == [b'N', b'CA', b'C1']
+    assert atoms['chain'].tolist() == [b'A', b'A', b'B']
+    assert atoms['resseq'].tolist() == [1, 1, 101]
+    np.testing.assert_allclose(atoms['xyz'][2], [-1.0, 2.5, 0.125])
+    # The short HETATM record has no B-factor column
+    np.testing.assert_array_equal(atoms['bfactor'], [12.5, 7.25, np.nan])
+
+def test_read_header_stops_at_first_model(tmp_path):
+    path = tmp_path / "ensemble.pdb"
+    path.write_bytes(PDB)
+    header = pdb_reader.read_header(str(path))
+    assert header.n_lines == 1
+    assert header.line(0).startswith(b"REMARK")
@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import phi_psi_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_parse_number_lists_pads_irregular_rows():
+    column = pd.Series(["(1.0; 2.0); (3.0; 4.0)", "5.0; 6.0; 7.0", None, "8.0; x"])
+    out = phi_psi_cache.parse_number_lists(column, 4)
+    np.testing.assert_array_equal(out[0], [1, 2, 3, 4])
+    np.testing.assert_array_equal(out[1, :3], [5, 6, 7])
+    assert np.isnan(out[1, 3]) and np.isnan(out[2]).all()
+    assert out[3, 0] == 8 and np.isnan(out[3, 1:]).all()
+
+def test_load_matches_csv_and_rebuilds_on_edit(tmp_path):
+    csv_path = str(tmp_path / "experimental.csv")
+    shutil.copy(os.path.join(ROOT, "experimental.csv"), csv_path)
+    df = pd.read_csv(csv_path)
+
+    cache = phi_psi_cache.load_phi_psi(csv_path)
+    assert cache['phi_psi'].shape == (len(df), phi_psi_cache.N_PHI_PSI, 2)
+    assert cache['plddt'].shape == (len(df), phi_psi_cache.N_PLDDT)
+    first = [float(v) for v in df['Phi_Psi_List'][0].replace('(', '').replace(')', '').split(';')]
+    np.testing.assert_allclose(cache['phi_psi'][0].ravel(), first, rtol=1e-6)
+
+    df.iloc[:3].to_csv(csv_path, index=False)
+    assert phi_psi_cache.load_phi_psi(csv_path)['phi_psi'].shape[0] == 3
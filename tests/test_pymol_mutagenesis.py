@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+pymol = pytest.importorskip("pymol")
+from pymol import cmd
+
+import pymol_mutagenesis
+from pdb_reader import read_atoms
+
+VARIANTS = [
+    [("A", "3", "GLY")],
+    [("A", "5", "TRP"), ("A", "9", "ALA")],
+    [("A", "3", "LYS")],
+    [("A", "12", "PRO")],
+    [("A", "7", "TYR")],
+]
+
+@pytest.fixture
+def peptide():
+    cmd.fab("ACDEFGHIKLMNPQRSTVWY", "peptide", ss=1, chain="A")
+    pdb = cmd.get_pdbstr("peptide")
+    cmd.delete("all")
+    return pdb
+
+def _atoms(pdb_string):
+    atoms = read_atoms(pdb_string.encode())
+    keys = list(zip(atoms['chain'].tolist(), atoms['resseq'].tolist(),
+                    atoms['resname'].tolist(), atoms['name'].tolist()))
+    return keys, atoms['xyz']
+
+def test_batch_matches_separate_mutations(peptide, tmp_path):
+    pdb_path = str(tmp_path / "peptide.pdb")
+    with open(pdb_path, 'w') as f:
+        f.write(peptide)
+
+    batch = list(pymol_mutagenesis.mutate_batch(peptide, VARIANTS))
+    assert [variant for variant, _ in batch] == VARIANTS
+
+    for variant, pdb_string in batch:
+        out_path = str(tmp_path / "single.pdb")
+        pymol_mutagenesis.perform_mutation(pdb_path, variant, out_path)
+        with open(out_path) as f:
+            expected_keys, expected_xyz = _atoms(f.read())
+        keys, xyz = _atoms(pdb_string)
+        residues = {(chain, str(resseq)): resname for chain, resseq, resname, _ in keys}
+        assert all(residues[(chain.encode(), res_num)] == new_res.encode() for chain, res_num, new_res in variant)
+        assert keys == expected_keys
+        np.testing.assert_allclose(xyz, expected_xyz, atol=1e-3)
+
+def test_batch_leaves_no_objects_behind(peptide):
+    list(pymol_mutagenesis.mutate_batch(peptide, VARIANTS[:2]))
+    assert cmd.get_names() == []